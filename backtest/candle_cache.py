@@ -0,0 +1,222 @@
+"""
+Columnar candle cache shared by the backtest scripts.
+
+The M1 CSV is parsed once into per-column .npy files (epoch-ns UTC
+timestamps plus float64 open/high/low/close) stored next to the source
+file. Later loads memory-map those arrays instead of re-parsing the CSV.
+The cache is keyed on the source file's size, mtime and SHA-1 hash.
+
+Each build is written to its own directory and a ``current`` file is switched
+to it, so a rebuild never replaces files a running process still maps
+(Windows cannot delete those). Older builds are removed when they can be.
+
+Candles can also be read from the bridge's ``candles_m1`` continuous
+aggregate (``load_db_candle_arrays``) instead of a CSV export.
+"""
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+CACHE_DIR_NAME = ".candle_cache"
+CACHE_VERSION = 1
+POINTER_NAME = "current"
+PRICE_COLUMNS = ("open", "high", "low", "close")
+DB_CANDLES_SQL = """
+SELECT (extract(epoch FROM bucket) * 1000000000)::bigint, open, high, low, close
+FROM {view}
+WHERE (%(start)s::timestamptz IS NULL OR bucket >= %(start)s)
+  AND (%(end)s::timestamptz IS NULL OR bucket < %(end)s)
+ORDER BY bucket"""
+
+
+class CandleArrays:
+    def __init__(self, ts, open_, high, low, close, fingerprint):
+        self.ts = ts            # int64 epoch nanoseconds, UTC
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.fingerprint = fingerprint  # SHA-1 of the source CSV (or of the columns, from the DB)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __repr__(self):
+        return f"CandleArrays(rows={len(self)}, fingerprint={self.fingerprint[:12]})"
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_dir_for(path):
+    path = os.path.abspath(path)
+    return os.path.join(os.path.dirname(path), CACHE_DIR_NAME, os.path.basename(path))
+
+
+def _parse_csv(path):
+    stamps = []
+    prices = ([], [], [], [])
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        next(reader)  # skip header
+        for row in reader:
+            if len(row) != 7: continue
+            d, t = row[0], row[1]
+            stamps.append(f"{d[:4]}-{d[4:6]}-{d[6:8]}T{t}")
+            for col, value in zip(prices, row[2:6]):
+                col.append(float(value))
+    ts = np.array(stamps, dtype="datetime64[s]").astype("datetime64[ns]").view(np.int64)
+    return ts, [np.array(col, dtype=np.float64) for col in prices]
+
+
+def _current_build(cache_dir):
+    """Directory of the build ``current`` points at, or None."""
+    try:
+        with open(os.path.join(cache_dir, POINTER_NAME)) as f:
+            return os.path.join(cache_dir, f.read().strip())
+    except OSError:
+        return None
+
+
+def _read_meta(build):
+    if build is None:
+        return None
+    try:
+        with open(os.path.join(build, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(cache_dir, meta):
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".json")
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp, os.path.join(cache_dir, "meta.json"))
+
+
+def _prune(cache_dir):
+    """Delete builds other than the current one; one still mapped is left for later."""
+    current = _current_build(cache_dir)
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if name == POINTER_NAME or path == current:
+            continue
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _build_cache(path, cache_dir, stat, fingerprint):
+    """Write a new build of ``path`` and point ``current`` at it; returns its directory."""
+    ts, prices = _parse_csv(path)
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=cache_dir, prefix="build-")
+    try:
+        np.save(os.path.join(staging, "ts.npy"), ts)
+        for name, col in zip(PRICE_COLUMNS, prices):
+            np.save(os.path.join(staging, f"{name}.npy"), col)
+        _write_meta(staging, {
+            "version": CACHE_VERSION,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha1": fingerprint,
+            "rows": int(len(ts)),
+        })
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, prefix=".current-")
+        with os.fdopen(fd, "w") as f:
+            f.write(os.path.basename(staging))
+        os.replace(tmp, os.path.join(cache_dir, POINTER_NAME))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    _prune(cache_dir)
+    return staging
+
+
+def load_candle_arrays(path, rebuild=False):
+    """Return memory-mapped candle columns for ``path``, building the cache if stale."""
+    cache_dir = cache_dir_for(path)
+    stat = os.stat(path)
+    build = _current_build(cache_dir)
+    meta = None if rebuild else _read_meta(build)
+
+    if meta is not None and meta.get("version") == CACHE_VERSION:
+        if meta["size"] != stat.st_size or meta["mtime_ns"] != stat.st_mtime_ns:
+            # Touched or copied files keep their cache as long as the content is unchanged
+            if meta["size"] == stat.st_size and meta["sha1"] == file_fingerprint(path):
+                meta["mtime_ns"] = stat.st_mtime_ns
+                _write_meta(build, meta)
+            else:
+                meta = None
+    else:
+        meta = None
+
+    if meta is None:
+        fingerprint = file_fingerprint(path)
+        build = _build_cache(path, cache_dir, stat, fingerprint)
+        meta = _read_meta(build)
+
+    def _open(name):
+        return np.load(os.path.join(build, f"{name}.npy"), mmap_mode="r")
+
+    return CandleArrays(_open("ts"), *(_open(name) for name in PRICE_COLUMNS), meta["sha1"])
+
+
+def load_db_candle_arrays(dsn, start=None, end=None, view="candles_m1"):
+    """Load M1 candles in ``[start, end)`` from the bridge database."""
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(DB_CANDLES_SQL.format(view=view), {"start": start, "end": end})
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    ts = np.array([r[0] for r in rows], dtype=np.int64)
+    prices = [np.array([r[i] for r in rows], dtype=np.float64) for i in range(1, 5)]
+    digest = hashlib.sha1(ts.tobytes())
+    for col in prices:
+        digest.update(col.tobytes())
+    return CandleArrays(ts, *prices, digest.hexdigest())
+
+
+def candle_frame(arrays, tz=None):
+    """DataFrame of ``arrays`` indexed by ``Timestamp`` (naive UTC unless ``tz``)."""
+    import pandas as pd
+
+    index = pd.DatetimeIndex(np.asarray(arrays.ts).view("datetime64[ns]"), name="Timestamp")
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return pd.DataFrame({
+        "Open": np.asarray(arrays.open),
+        "High": np.asarray(arrays.high),
+        "Low": np.asarray(arrays.low),
+        "Close": np.asarray(arrays.close),
+    }, index=index)
+
+
+def load_candle_frame(path, tz=None):
+    """Return the cached candles as a DataFrame indexed by ``Timestamp``.
+
+    Columns are always ``Open``, ``High``, ``Low`` and ``Close`` whatever the
+    CSV header says; the CSV's volume column is not cached. The index is naive
+    UTC unless ``tz`` is given.
+    """
+    return candle_frame(load_candle_arrays(path), tz)
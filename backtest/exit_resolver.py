@@ -0,0 +1,67 @@
+"""
+Batched first-touch TP/SL resolution for short entries.
+
+For every entry bar ``i`` the bars ``i + 1 .. i + horizon`` are scanned for the
+first one whose low reaches the TP or whose high reaches the SL. As in the
+original per-trade loop, TP is checked before SL within the same bar, and a
+trade that touches neither times out at its entry bar.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+WIN = 1
+LOSS = -1
+TIMEOUT = 0
+RESULT_NAMES = {WIN: "win", LOSS: "loss", TIMEOUT: "timeout"}
+
+MAX_HOLD_BARS = 59          # range(i + 1, i + 60)
+CHUNK_SIZE = 65536          # entries per window block, bounds peak memory
+
+
+def _first_touch(hits):
+    """Index of the first True per row, or the row width when there is none."""
+    first = hits.argmax(axis=1)
+    first[~hits.any(axis=1)] = hits.shape[1]
+    return first
+
+
+def resolve_exits(high, low, entries, tp, sl, win_pnl, loss_pnl, horizon=MAX_HOLD_BARS):
+    """Resolve all trades at once.
+
+    Returns ``(codes, exit_idx, pnl)`` arrays aligned with ``entries``;
+    ``codes`` holds WIN/LOSS/TIMEOUT and timeouts exit at their entry index.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    entries = np.asarray(entries, dtype=np.int64)
+    tp = np.broadcast_to(np.asarray(tp, dtype=np.float64), entries.shape)
+    sl = np.broadcast_to(np.asarray(sl, dtype=np.float64), entries.shape)
+
+    codes = np.full(len(entries), TIMEOUT, dtype=np.int8)
+    exit_idx = entries.copy()
+    if len(entries) == 0 or horizon <= 0:
+        return codes, exit_idx, np.zeros(len(entries))
+
+    # Pad so that windows running past the last bar can never touch
+    pad = max(0, int(entries.max()) + horizon + 1 - len(low))
+    if pad:
+        high = np.concatenate([high, np.full(pad, -np.inf)])
+        low = np.concatenate([low, np.full(pad, np.inf)])
+    high_windows = sliding_window_view(high[1:], horizon)
+    low_windows = sliding_window_view(low[1:], horizon)
+
+    for lo in range(0, len(entries), CHUNK_SIZE):
+        block = slice(lo, lo + CHUNK_SIZE)
+        rows = entries[block]
+        first_tp = _first_touch(low_windows[rows] <= tp[block, None])
+        first_sl = _first_touch(high_windows[rows] >= sl[block, None])
+
+        win = (first_tp < horizon) & (first_tp <= first_sl)
+        loss = ~win & (first_sl < horizon)
+        codes[block][win] = WIN
+        codes[block][loss] = LOSS
+        exit_idx[block][win] = rows[win] + 1 + first_tp[win]
+        exit_idx[block][loss] = rows[loss] + 1 + first_sl[loss]
+
+    pnl = np.where(codes == WIN, win_pnl, np.where(codes == LOSS, loss_pnl, 0.0))
+    return codes, exit_idx, pnl
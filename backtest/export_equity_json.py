@@ -1,7 +1,11 @@
 import os
+import sys
 import csv
 import json
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from webapp.equity import lttb, parse_times, DEFAULT_POINTS
+
 csv_path = "simulated_trades.csv"
 
 
@@ -22,7 +26,11 @@ with open(csv_path, newline='') as f:
             "y": round(equity, 2)
         })
 
+# LTTB keeps the curve's shape in a fixed-size file; /api/equity serves the full detail
+keep = lttb(parse_times([p["x"] for p in points]), [p["y"] for p in points], DEFAULT_POINTS)
+points = [points[i] for i in keep]
+
 with open(output_path, "w") as out:
-    json.dump(points, out, indent=2)
+    json.dump(points, out, separators=(",", ":"))
 
 print(f"✅ Exported {len(points)} equity points to {output_path}")
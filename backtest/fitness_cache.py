@@ -0,0 +1,61 @@
+"""
+Persistent fitness memo for the genetic optimizer.
+
+Scores are keyed on (ma_period, tp_pips, sl_pips, dataset fingerprint,
+simulator version) and appended to a JSON-lines file, so repeated individuals
+within a run and across resumed runs are never simulated twice. Bump
+simulate_pnl.SIMULATOR_VERSION whenever simulation results change.
+"""
+import json
+import os
+
+CACHE_PATH = "fitness_cache.jsonl"
+
+
+class FitnessCache:
+    def __init__(self, fingerprint, version, path=CACHE_PATH):
+        self.fingerprint = fingerprint
+        self.version = version
+        self.path = path
+        self.scores = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from an interrupted run
+                if rec.get("fingerprint") == self.fingerprint and rec.get("version") == self.version:
+                    self.scores[self.key(rec["params"])] = rec["score"]
+
+    @staticmethod
+    def key(params):
+        return (params["ma_period"], params["tp_pips"], params["sl_pips"])
+
+    def get(self, params):
+        return self.scores.get(self.key(params))
+
+    def put_many(self, items):
+        """Store ``(params, score)`` pairs and append the new ones to disk."""
+        lines = []
+        for params, score in items:
+            k = self.key(params)
+            if k in self.scores:
+                continue
+            self.scores[k] = score
+            lines.append(json.dumps({
+                "params": {"ma_period": k[0], "tp_pips": k[1], "sl_pips": k[2]},
+                "fingerprint": self.fingerprint,
+                "version": self.version,
+                "score": score,
+            }))
+        if lines:
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def __len__(self):
+        return len(self.scores)
@@ -0,0 +1,96 @@
+"""
+Per-dataset indicator cache shared across backtest runs.
+
+A store wraps one loaded candle dataset and memoizes derived arrays (moving
+averages, session masks, ...) in a bounded LRU, so repeated simulations with
+overlapping parameters - e.g. the genetic optimizer - compute each indicator
+once. New indicators are added with ``register_indicator``.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from candle_cache import load_candle_arrays
+from session_calendar import SessionCalendar
+from signal_engine import rolling_mean
+
+DEFAULT_MAX_ENTRIES = 32
+
+INDICATORS = {}
+
+
+def register_indicator(name, fn):
+    """Register ``fn(store, *params)`` under ``name``.
+
+    ``fn`` reads ``store.candles`` and may build on other cached indicators.
+    """
+    INDICATORS[name] = fn
+
+
+register_indicator("ma", lambda store, period: rolling_mean(store.candles.close, period))
+register_indicator("calendar", lambda store, tz: SessionCalendar(store.candles.ts, tz))
+register_indicator("session", lambda store, start, end, tz: store.calendar(tz).session_mask(start, end))
+
+
+class IndicatorStore:
+    def __init__(self, candles, max_entries=DEFAULT_MAX_ENTRIES):
+        self.candles = candles
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def fingerprint(self):
+        return self.candles.fingerprint
+
+    def get(self, name, *params):
+        key = (name, params)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return self._cache[key]
+
+        self.misses += 1
+        values = INDICATORS[name](self, *params)
+        if isinstance(values, np.ndarray):
+            values.flags.writeable = False  # shared between callers
+        self._cache[key] = values
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return values
+
+    def ma(self, period):
+        return self.get("ma", period)
+
+    def calendar(self, tz):
+        return self.get("calendar", tz)
+
+    def session_mask(self, trading_start, trading_end, tz):
+        return self.get("session", trading_start, trading_end, tz)
+
+    def warm(self, name, param_sets):
+        """Precompute ``name`` for each entry of ``param_sets`` (scalars or tuples)."""
+        for params in param_sets:
+            self.get(name, *(params if isinstance(params, tuple) else (params,)))
+
+    def __len__(self):
+        return len(self._cache)
+
+
+_STORES = {}
+
+
+def get_store(path, max_entries=DEFAULT_MAX_ENTRIES):
+    """Return the process-wide store for ``path``, reloading only if the file changed."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cached = _STORES.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    store = IndicatorStore(load_candle_arrays(path), max_entries=max_entries)
+    _STORES[path] = (key, store)
+    return store
@@ -0,0 +1,188 @@
+"""
+Event-driven multi-position portfolio simulator for the sell setup.
+
+Replaces the per-bar ``df.iloc`` loops of simulate_strat.py and
+simulate_strat_margin_safe.py. Open positions live in fixed-capacity NumPy
+arrays (one slot per allowed open trade, kept in entry order) and bars are
+read from plain arrays. Bars with no open position and no signal are skipped
+outright, since nothing can change on them.
+
+Rule switches reproduce both scripts:
+
+    trailing="breakeven"  trail from the best close once +breakeven pips (smart exits)
+    trailing="bar_high"   trail from the highest bar high since entry (margin safe)
+    mark_to_market        "pips" (pips * pip_value) or "contract" (contract_size * lot / 10000)
+    equity_includes_exits positions closed on a bar still count toward that bar's
+                          floating PnL and margin (smart exits marks before exiting)
+    loss_exit_bars        close losers after N bars unless ``near_sr(price)`` is true
+    stop_out              "halt" ends the run, "liquidate" books equity and flattens
+"""
+import numpy as np
+
+
+class PortfolioSimulator:
+    def __init__(self, initial_balance=100, max_open_trades=4, lot=0.01,
+                 pip_size=0.01, pip_value=0.07, leverage=2000, contract_size=100000,
+                 stop_out_level=25, tsl_pips=15, trailing="breakeven",
+                 breakeven_trigger_pips=5, mark_to_market="pips",
+                 equity_includes_exits=True, loss_exit_bars=None, near_sr=None,
+                 stop_out="halt"):
+        if trailing not in ("breakeven", "bar_high"):
+            raise ValueError(f"unknown trailing mode: {trailing}")
+        if mark_to_market not in ("pips", "contract"):
+            raise ValueError(f"unknown mark_to_market mode: {mark_to_market}")
+        if stop_out not in ("halt", "liquidate"):
+            raise ValueError(f"unknown stop_out mode: {stop_out}")
+
+        self.initial_balance = initial_balance
+        self.capacity = max_open_trades
+        self.lot = lot
+        self.pip_size = pip_size
+        self.pip_value = pip_value
+        self.contract_size = contract_size
+        self.margin_per_trade = (lot * contract_size) / leverage
+        self.stop_out_level = stop_out_level
+        self.tsl_offset = tsl_pips * pip_size
+        self.trailing = trailing
+        self.breakeven_offset = breakeven_trigger_pips * pip_size
+        self.mark_to_market = mark_to_market
+        self.equity_includes_exits = equity_includes_exits
+        self.loss_exit_bars = loss_exit_bars
+        self.near_sr = near_sr
+        self.stop_out = stop_out
+
+        cap = max_open_trades
+        self.entry_index = np.zeros(cap, dtype=np.int64)
+        self.entry_price = np.zeros(cap, dtype=np.float64)
+        self.highest = np.zeros(cap, dtype=np.float64)
+        self.pnl = np.zeros(cap, dtype=np.float64)
+        self.bars_open = np.zeros(cap, dtype=np.int64)
+        self.trailing_active = np.zeros(cap, dtype=bool)
+        self.n_open = 0
+
+    def _open(self, i, price):
+        k = self.n_open
+        self.entry_index[k] = i
+        self.entry_price[k] = price
+        self.highest[k] = price
+        self.pnl[k] = 0
+        self.bars_open[k] = 0
+        self.trailing_active[k] = False
+        self.n_open += 1
+
+    def _keep(self, src, dst):
+        if src != dst:
+            for arr in (self.entry_index, self.entry_price, self.highest,
+                        self.pnl, self.bars_open, self.trailing_active):
+                arr[dst] = arr[src]
+
+    def _exit_pnl(self, entry, price):
+        return round(float((entry - price) / self.pip_size * self.pip_value), 2)
+
+    def run(self, ts, high, close, signal, start=0):
+        """Simulate over the bars from ``start``; ``signal[i]`` marks entry bars.
+
+        Returns a dict with the closed ``trades`` (entry/exit bar indices, prices
+        and PnL, in exit order), the final ``balance`` and, if the account was
+        stopped out, ``stop_out_index`` / ``stop_out_equity``.
+        """
+        ts = np.asarray(ts)
+        highs = np.asarray(high, dtype=np.float64).tolist()
+        closes = np.asarray(close, dtype=np.float64).tolist()
+        signal_idx = np.flatnonzero(np.asarray(signal, dtype=bool)[start:]) + start
+        n = len(closes)
+
+        self.n_open = 0
+        balance = self.initial_balance
+        trades = []
+        result = {"trades": trades, "stop_out_index": None, "stop_out_equity": None}
+
+        pips_mark = self.mark_to_market == "pips"
+        contract_lot = self.contract_size * self.lot
+        margin_per_trade = self.margin_per_trade
+        loss_exit_bars = self.loss_exit_bars
+        next_signal = 0
+        i = start
+
+        while i < n:
+            if self.n_open == 0:
+                # Flat and no signal: equity, margin and positions cannot change
+                next_signal = np.searchsorted(signal_idx, i)
+                if next_signal == len(signal_idx):
+                    break
+                i = int(signal_idx[next_signal])
+
+            price = closes[i]
+            floating_pnl = 0
+            margin_used = 0
+            kept = 0
+
+            for k in range(self.n_open):
+                entry = self.entry_price[k]
+                self.bars_open[k] += 1
+                if pips_mark:
+                    pnl = (entry - price) / self.pip_size * self.pip_value
+                else:
+                    pnl = (entry - price) * contract_lot / 10000
+                self.pnl[k] = pnl
+                if self.equity_includes_exits:
+                    floating_pnl += pnl
+                    margin_used += margin_per_trade
+
+                exit_now = False
+                if self.trailing == "breakeven":
+                    if not self.trailing_active[k] and (entry - price) >= self.breakeven_offset:
+                        self.trailing_active[k] = True
+                        self.highest[k] = max(self.highest[k], price)
+                    if self.trailing_active[k]:
+                        self.highest[k] = max(self.highest[k], price)
+                        exit_now = price <= self.highest[k] - self.tsl_offset
+                else:
+                    self.highest[k] = max(self.highest[k], highs[i])
+                    exit_now = price <= self.highest[k] - self.tsl_offset
+
+                if (not exit_now and loss_exit_bars is not None and pnl < 0
+                        and self.bars_open[k] >= loss_exit_bars):
+                    exit_now = self.near_sr is None or not self.near_sr(price)
+
+                if exit_now:
+                    exit_pnl = self._exit_pnl(entry, price)
+                    trades.append({
+                        "entry_index": int(self.entry_index[k]),
+                        "exit_index": i,
+                        "entry_price": entry,
+                        "exit_price": price,
+                        "pnl": exit_pnl,
+                    })
+                    balance += exit_pnl
+                    continue
+
+                if not self.equity_includes_exits:
+                    floating_pnl += pnl
+                    margin_used += margin_per_trade
+                self._keep(k, kept)
+                kept += 1
+
+            self.n_open = kept
+            equity = balance + floating_pnl
+            margin_level = (equity / margin_used) * 100 if margin_used > 0 else float("inf")
+            free_margin = equity - margin_used
+
+            if margin_level < self.stop_out_level:
+                if self.stop_out == "halt":
+                    result["stop_out_index"] = i
+                    result["stop_out_equity"] = equity
+                    break
+                balance = equity
+                self.n_open = 0
+                i += 1
+                continue
+
+            if signal[i] and self.n_open < self.capacity and free_margin >= margin_per_trade:
+                # One entry per timestamp, even if the index repeats a bar time
+                if not (ts[self.entry_index[:self.n_open]] == ts[i]).any():
+                    self._open(i, price)
+            i += 1
+
+        result["balance"] = balance
+        return result
@@ -1,9 +1,20 @@
 # profit_onset_analyzer.py
 # Phase 1: TTP (Time-To-Profit) Analyzer
+#
+# For every trade, looks at the M1 candles from entry_time to entry_time + 1h
+# (both ends inclusive) and records
+#   time_to_profit_min   wins: minutes until the first bar that reaches TP
+#   profit_then_reverse  losses: whether any bar reached TP first
+#   mfe_pips / mae_pips  best / worst excursion from entry_price in that hour
+#
+# All trades are enriched at once: searchsorted maps each entry to its first
+# and last bar, and the hour of high/low per trade is a row of a sliding
+# window view over the candle arrays, so there is no per-trade slicing.
 
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import csv
+from numpy.lib.stride_tricks import sliding_window_view
+from candle_cache import load_candle_arrays
 
 # Load trades
 TRADES_CSV = "simulated_trades.csv"
@@ -13,81 +24,96 @@ OUTPUT_CSV = "ttp_ptr_enriched_trades.csv"
 # PIP scale (0.01 for USDJPY)
 PIP_SCALE = 0.01
 
-# Load candle data
-candles = []
-with open(CANDLES_CSV, newline='') as f:
-    reader = csv.reader(f)
-    next(reader)  # skip header
-    for row in reader:
-        if len(row) < 6:
-            continue
-        date_str, time_str = row[0], row[1]
-        dt = datetime.strptime(date_str + time_str, "%Y%m%d%H:%M:%S")
-        o, h, l, c = map(float, row[2:6])
-        candles.append({"dt": dt, "open": o, "high": h, "low": l, "close": c})
-
-# Convert to DataFrame for quick lookup
-df_candles = pd.DataFrame(candles).set_index("dt")
-
-# Load simulated trades
-df_trades = pd.read_csv(TRADES_CSV, parse_dates=["entry_time", "exit_time"])
-
-# Helper to get first candle where TP would have been hit
-def get_time_to_tp(entry_time, side, tp_price):
-    subset = df_candles.loc[entry_time: entry_time + timedelta(hours=1)]
-    for i, row in subset.iterrows():
-        if side == "buy" and row["high"] >= tp_price:
-            return (i - entry_time).total_seconds() / 60
-        elif side == "sell" and row["low"] <= tp_price:
-            return (i - entry_time).total_seconds() / 60
-    return None  # never hit TP
-
-# Helper to check if loss trade was ever in profit (PTR)
-def check_profit_then_reverse(entry_time, side, entry_price, tp):
-    subset = df_candles.loc[entry_time: entry_time + timedelta(hours=1)]
-    for _, row in subset.iterrows():
-        if side == "buy" and row["high"] >= tp:
-            return True
-        elif side == "sell" and row["low"] <= tp:
-            return True
-    return False
-
-# Enrich trades with TTP and PTR
-ttp_results = []
-ptr_results = []
-
-for _, trade in df_trades.iterrows():
-    if trade["result"] == "win":
-        ttp = get_time_to_tp(trade["entry_time"], trade["side"], trade["tp"])
-        ttp_results.append(ttp)
-        ptr_results.append(None)
-    elif trade["result"] == "loss":
-        ptr = check_profit_then_reverse(trade["entry_time"], trade["side"], trade["entry_price"], trade["tp"])
-        ptr_results.append(ptr)
-        ttp_results.append(None)
-    else:
-        ttp_results.append(None)
-        ptr_results.append(None)
-
-df_trades["time_to_profit_min"] = ttp_results
-df_trades["profit_then_reverse"] = ptr_results
-
-# Save enriched trades
-df_trades.to_csv(OUTPUT_CSV, index=False)
-print(f"✅ TTP/PTR enriched trades saved to {OUTPUT_CSV}")
-
-# Optional summary
-valid_ttps = df_trades["time_to_profit_min"].dropna()
-ptr_losses = df_trades[df_trades["profit_then_reverse"] == True]
-
-if not valid_ttps.empty:
-    print("\n📈 TTP Summary:")
-    print(f"• Average TTP: {valid_ttps.mean():.2f} min")
-    print(f"• Median TTP: {valid_ttps.median():.2f} min")
-    print(f"• Fastest win: {valid_ttps.min():.1f} min")
-    print(f"• Slowest win: {valid_ttps.max():.1f} min")
-
-if not ptr_losses.empty:
-    print("\n📉 PTR Summary:")
-    print(f"• Total losses that were in profit first: {len(ptr_losses)}")
-    print(f"• Percent of losses with PTR: {100 * len(ptr_losses) / len(df_trades[df_trades['result'] == 'loss']):.2f}%")
+HORIZON = pd.Timedelta(hours=1)
+CHUNK_TRADES = 50_000   # bounds the (trades x window) scratch arrays
+
+
+def _window_bounds(ts, entry_ns, horizon_ns):
+    lo = np.searchsorted(ts, entry_ns, "left")
+    hi = np.searchsorted(ts, entry_ns + horizon_ns, "right")
+    return lo, hi
+
+
+def enrich(trades, candles, horizon=HORIZON, pip_scale=PIP_SCALE):
+    """Return ``trades`` with time_to_profit_min, profit_then_reverse, mfe_pips and mae_pips."""
+    ts = np.asarray(candles.ts)
+    entry_ns = trades["entry_time"].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    lo, hi = _window_bounds(ts, entry_ns, horizon.value)
+    width = max(int((hi - lo).max()) if len(lo) else 0, 1)
+
+    # pad so every window start (up to len(ts)) has ``width`` columns
+    high = np.concatenate((np.asarray(candles.high), np.full(width, -np.inf)))
+    low = np.concatenate((np.asarray(candles.low), np.full(width, np.inf)))
+    high_win = sliding_window_view(high, width)
+    low_win = sliding_window_view(low, width)
+
+    is_buy = (trades["side"] == "buy").to_numpy()
+    tp = trades["tp"].to_numpy(dtype=np.float64)
+    entry_price = trades["entry_price"].to_numpy(dtype=np.float64)
+
+    n = len(trades)
+    first_hit = np.full(n, -1, dtype=np.int64)
+    max_high = np.full(n, np.nan)
+    min_low = np.full(n, np.nan)
+    cols = np.arange(width)
+    for s in range(0, n, CHUNK_TRADES):
+        sl = slice(s, s + CHUNK_TRADES)
+        valid = cols < (hi[sl] - lo[sl])[:, None]
+        h = np.where(valid, high_win[lo[sl]], -np.inf)
+        l = np.where(valid, low_win[lo[sl]], np.inf)
+        hit = np.where(is_buy[sl, None], h >= tp[sl, None], l <= tp[sl, None])
+        any_hit = hit.any(axis=1)
+        first_hit[sl] = np.where(any_hit, hit.argmax(axis=1), -1)
+        has_bars = valid[:, 0]
+        max_high[sl] = np.where(has_bars, h.max(axis=1), np.nan)
+        min_low[sl] = np.where(has_bars, l.min(axis=1), np.nan)
+
+    hit_any = first_hit >= 0
+    hit_ts = ts[np.minimum(lo + np.maximum(first_hit, 0), len(ts) - 1)] if len(ts) else np.zeros(n, np.int64)
+    ttp = np.where(hit_any, (hit_ts - entry_ns) / 60e9, np.nan)
+
+    result = trades["result"].to_numpy()
+    out = trades.copy()
+    out["time_to_profit_min"] = np.where(result == "win", ttp, np.nan)
+    out["profit_then_reverse"] = pd.Series(hit_any, index=trades.index, dtype=object).where(result == "loss", None)
+    out["mfe_pips"] = np.where(is_buy, max_high - entry_price, entry_price - min_low) / pip_scale
+    out["mae_pips"] = np.where(is_buy, entry_price - min_low, max_high - entry_price) / pip_scale
+    return out
+
+
+def summarize(df_trades):
+    valid_ttps = df_trades["time_to_profit_min"].dropna()
+    ptr_losses = df_trades[df_trades["profit_then_reverse"] == True]
+
+    if not valid_ttps.empty:
+        print("\n📈 TTP Summary:")
+        print(f"• Average TTP: {valid_ttps.mean():.2f} min")
+        print(f"• Median TTP: {valid_ttps.median():.2f} min")
+        print(f"• Fastest win: {valid_ttps.min():.1f} min")
+        print(f"• Slowest win: {valid_ttps.max():.1f} min")
+
+    if not ptr_losses.empty:
+        print("\n📉 PTR Summary:")
+        print(f"• Total losses that were in profit first: {len(ptr_losses)}")
+        print(f"• Percent of losses with PTR: {100 * len(ptr_losses) / len(df_trades[df_trades['result'] == 'loss']):.2f}%")
+
+    mfe = df_trades["mfe_pips"].dropna()
+    if not mfe.empty:
+        print("\n📏 Excursions (first hour):")
+        print(f"• Median MFE: {mfe.median():.1f} pips")
+        print(f"• Median MAE: {df_trades['mae_pips'].dropna().median():.1f} pips")
+
+
+if __name__ == "__main__":
+    # Load candle data and simulated trades
+    candles = load_candle_arrays(CANDLES_CSV)
+    df_trades = pd.read_csv(TRADES_CSV, parse_dates=["entry_time", "exit_time"])
+
+    # Enrich trades with TTP, PTR, MFE and MAE
+    df_trades = enrich(df_trades, candles)
+
+    # Save enriched trades
+    df_trades.to_csv(OUTPUT_CSV, index=False)
+    print(f"✅ TTP/PTR enriched trades saved to {OUTPUT_CSV}")
+
+    summarize(df_trades)
@@ -0,0 +1,74 @@
+"""
+Precomputed session calendar for UTC candle timestamps.
+
+Converts a whole epoch-ns timestamp column to local wall-clock time in one
+vectorized step and exposes integer arrays (second/minute of day, day of week)
+so simulators and analyzers can filter and bucket bars with integer
+comparisons instead of building datetime objects and strings per bar.
+
+UTC offsets are looked up once per run of bars sharing the same UTC hour,
+which covers every DST transition of hour-aligned zones such as US/Eastern.
+"""
+import datetime
+
+import numpy as np
+
+NS_PER_SECOND = 1_000_000_000
+SECONDS_PER_HOUR = 3600
+SECONDS_PER_DAY = 86400
+MINUTES_PER_DAY = 1440
+EPOCH_WEEKDAY = 3  # 1970-01-01 was a Thursday (Monday = 0)
+
+
+def utc_offsets(ts_ns, tz):
+    """UTC offset in seconds of ``tz`` at each UTC epoch-ns timestamp."""
+    seconds = np.asarray(ts_ns, dtype=np.int64) // NS_PER_SECOND
+    if len(seconds) == 0:
+        return np.zeros(0, dtype=np.int64)
+    hours = seconds // SECONDS_PER_HOUR
+    change = np.empty(len(hours), dtype=bool)
+    change[0] = True
+    np.not_equal(hours[1:], hours[:-1], out=change[1:])
+    offsets = np.array([
+        datetime.datetime.fromtimestamp(int(h) * SECONDS_PER_HOUR, tz).utcoffset().total_seconds()
+        for h in hours[change]
+    ], dtype=np.int64)
+    return offsets[np.cumsum(change) - 1]
+
+
+def time_to_seconds(t):
+    return t.hour * SECONDS_PER_HOUR + t.minute * 60 + t.second + t.microsecond / 1e6
+
+
+def minute_label(minute):
+    """``"%H:%M"`` label for a minute-of-day code."""
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+class SessionCalendar:
+    def __init__(self, ts_ns, tz):
+        self.tz = tz
+        self.ts = np.asarray(ts_ns, dtype=np.int64)
+        local_s = self.ts // NS_PER_SECOND + utc_offsets(self.ts, tz)
+        self.local_seconds = local_s
+        self.day = local_s // SECONDS_PER_DAY                      # local days since epoch
+        self.second_of_day = (local_s % SECONDS_PER_DAY).astype(np.int32)
+        self.minute_of_day = (self.second_of_day // 60).astype(np.int16)
+        self.day_of_week = ((self.day + EPOCH_WEEKDAY) % 7).astype(np.int8)
+
+    def __len__(self):
+        return len(self.ts)
+
+    def session_mask(self, start, end):
+        """Bars whose local time of day is within [start, end] (``datetime.time``)."""
+        return (self.second_of_day >= time_to_seconds(start)) & (self.second_of_day <= time_to_seconds(end))
+
+    def format_local(self, idx):
+        """Local ``"%Y-%m-%d %H:%M:%S"`` strings for the bars at ``idx``."""
+        stamps = np.datetime_as_string(self.local_seconds[idx].astype("datetime64[s]"), unit="s")
+        return np.char.replace(stamps, "T", " ").tolist()
+
+    def local_datetimes(self, idx):
+        """Timezone-aware datetimes for the bars at ``idx`` (e.g. for plotting)."""
+        return [datetime.datetime.fromtimestamp(s, self.tz)
+                for s in (self.ts[idx] // NS_PER_SECOND).tolist()]
@@ -0,0 +1,103 @@
+"""
+Vectorized signal detection for the MA-break / retest / low-break sell setup.
+
+Mirrors the per-bar loop in simulate_pnl.simulate_strategy:
+
+    ma             = mean(close[i - ma_period:i])
+    broke_below_ma = close[i - 2] > ma and close[i - 1] < ma
+    retest_ma      = high[i - 1] >= ma
+    broke_low      = low[i] < min(low[i - 1], low[i - 2])
+
+evaluated only inside the ET trading window, but over whole arrays at once.
+"""
+import statistics
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from session_calendar import SessionCalendar
+
+# Rolling sums carry a few ulps of error; comparisons closer than this are
+# re-checked with statistics.mean so the entries match the scalar loop exactly.
+MA_TIE_EPSILON = 1e-9
+
+
+def rolling_mean(values, period):
+    """Return ``ma`` where ``ma[i] == mean(values[i - period:i])`` (NaN for ``i < period``)."""
+    values = np.asarray(values, dtype=np.float64)
+    ma = np.full(len(values), np.nan)
+    if len(values) > period:
+        ma[period:] = sliding_window_view(values[:-1], period).sum(axis=1) / period
+    return ma
+
+
+def session_mask(ts_ns, trading_start, trading_end, tz):
+    """Boolean mask of bars whose local wall-clock time is within [start, end]."""
+    return SessionCalendar(ts_ns, tz).session_mask(trading_start, trading_end)
+
+
+def detect_entries(close, high, low, ma_period, mask=None, start=None, stop=None, ma=None):
+    """Return the bar indices where the sell setup triggers.
+
+    Indices are scanned over ``range(start, stop)``; ``start`` defaults to
+    ``ma_period + 2`` and ``stop`` to the number of bars. ``ma`` may be passed
+    in when it has already been computed with :func:`rolling_mean`.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(close)
+    start = ma_period + 2 if start is None else max(start, ma_period + 2)
+    stop = n if stop is None else min(stop, n)
+    if stop <= start:
+        return np.empty(0, dtype=np.int64)
+
+    idx = slice(start, stop)
+    ma = (rolling_mean(close, ma_period) if ma is None else np.asarray(ma))[idx]
+    c1, c2 = close[start - 1:stop - 1], close[start - 2:stop - 2]
+    h1 = high[start - 1:stop - 1]
+    l0, l1, l2 = low[idx], low[start - 1:stop - 1], low[start - 2:stop - 2]
+
+    candidate = l0 < np.minimum(l1, l2)
+    if mask is not None:
+        candidate &= np.asarray(mask, dtype=bool)[idx]
+
+    signal = candidate & (c2 > ma) & (c1 < ma) & (h1 >= ma)
+
+    # Resolve near-ties against the exact mean used by the scalar loop
+    near = candidate & (
+        (np.abs(c2 - ma) <= MA_TIE_EPSILON)
+        | (np.abs(c1 - ma) <= MA_TIE_EPSILON)
+        | (np.abs(h1 - ma) <= MA_TIE_EPSILON)
+    )
+    for k in np.flatnonzero(near):
+        i = start + k
+        exact = statistics.mean(close[i - ma_period:i].tolist())
+        signal[k] = close[i - 2] > exact and close[i - 1] < exact and high[i - 1] >= exact
+
+    return np.flatnonzero(signal) + start
+
+
+def lagged_ma_signals(close, high, low, ma):
+    """Entry mask for the portfolio simulators (simulate_strat*.py).
+
+    Here ``ma[i]`` includes bar ``i`` (a pandas ``rolling().mean()``), and the
+    break/retest is judged against the MA of the bars it happened on:
+
+        close[i - 2] > ma[i - 2] and close[i - 1] < ma[i - 1]
+        high[i - 1] >= ma[i - 1]
+        low[i] < min(low[i - 1], low[i - 2])
+    """
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    ma = np.asarray(ma, dtype=np.float64)
+    signal = np.zeros(len(close), dtype=bool)
+    if len(close) > 2:
+        signal[2:] = (
+            (close[:-2] > ma[:-2])
+            & (close[1:-1] < ma[1:-1])
+            & (high[1:-1] >= ma[1:-1])
+            & (low[2:] < np.minimum(low[1:-1], low[:-2]))
+        )
+    return signal
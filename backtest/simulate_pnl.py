@@ -1,9 +1,13 @@
 import csv
 import datetime
-import statistics
+import numpy as np
 import pytz
 import matplotlib.pyplot as plt
-from collections import defaultdict
+from signal_engine import detect_entries
+from session_calendar import MINUTES_PER_DAY, minute_label
+from indicator_store import get_store
+from sr_index import LevelIndex
+from exit_resolver import resolve_exits, RESULT_NAMES, WIN, LOSS
 
 
 # Shared Config (defaults)
@@ -13,29 +17,7 @@ DATA_PATH = "usdjpy_m1.csv"
 PIP_SCALE = 0.01
 PIP_VALUE_PER_LOT = 10
 LOT_SIZE = 0.25
-
-# Candle container
-class Candle:
-    def __init__(self, dt, open_, high, low, close):
-        self.dt = dt
-        self.open = open_
-        self.high = high
-        self.low = low
-        self.close = close
-
-def load_candles():
-    candles = []
-    with open(DATA_PATH) as f:
-        reader = csv.reader(f)
-        next(reader)
-        for row in reader:
-            if len(row) != 7: continue
-            date_str, time_str = row[0], row[1]
-            dt = datetime.datetime.strptime(date_str + time_str, "%Y%m%d%H:%M:%S")
-            dt = pytz.utc.localize(dt).astimezone(TIMEZONE)
-            o, h, l, c = map(float, row[2:6])
-            candles.append(Candle(dt, o, h, l, c))
-    return candles
+SIMULATOR_VERSION = 1  # bump when a change alters simulated results (invalidates fitness caches)
 
 # ... (unchanged imports and setup)
 def simulate_strategy(ma_period=10, tp_pips=15, sl_pips=10,
@@ -44,93 +26,78 @@ def simulate_strategy(ma_period=10, tp_pips=15, sl_pips=10,
                       output_csv="simulated_trades.csv",
                       performance_log="timeblock_profit.csv",
                       equity_curve_png="equity_curve.png",
-                      silent=False):
-    candles = load_candles()
+                      silent=False,
+                      store=None):
+    if store is None:
+        store = get_store(DATA_PATH)
+    candles = store.candles
+    high, low, close = candles.high, candles.low, candles.close
+    calendar = store.calendar(TIMEZONE)
     entries = []
-    profit_by_time = defaultdict(lambda: {"trades": 0, "wins": 0, "losses": 0})
     cumulative_profit = 0.0
     balance_history = []
 
-    for i in range(ma_period + 2, len(candles) - 60):
-        now = candles[i]
-        if not (trading_start <= now.dt.time() <= trading_end):
-            continue
-
-        closes = [c.close for c in candles[i - ma_period:i]]
-        ma = statistics.mean(closes)
-        prev = candles[i - 1]
-        prev2 = candles[i - 2]
-
-        broke_below_ma = prev2.close > ma and prev.close < ma
-        retest_ma = prev.high >= ma
-        broke_low = now.low < min(prev.low, prev2.low)
-
-        if broke_below_ma and retest_ma and broke_low:
-            entry_price = now.close
-            tp = entry_price - tp_pips * PIP_SCALE
-            sl = entry_price + sl_pips * PIP_SCALE
-            result = "timeout"
-            exit_price = entry_price
-            pnl = 0.0
-            exit_time = now.dt
-
-            for j in range(i + 1, i + 60):
-                future = candles[j]
-                if future.low <= tp:
-                    result = "win"
-                    exit_price = tp
-                    pnl = tp_pips * LOT_SIZE * PIP_VALUE_PER_LOT
-                    exit_time = future.dt
-                    break
-                elif future.high >= sl:
-                    result = "loss"
-                    exit_price = sl
-                    pnl = -sl_pips * LOT_SIZE * PIP_VALUE_PER_LOT
-                    exit_time = future.dt
-                    break
-
-            hour_block = now.dt.strftime("%H:%M")
-            profit_by_time[hour_block]["trades"] += 1
-            if result == "win":
-                profit_by_time[hour_block]["wins"] += 1
-            elif result == "loss":
-                profit_by_time[hour_block]["losses"] += 1
-
-            cumulative_profit += pnl
-            balance_history.append((exit_time, cumulative_profit))
-
-            entries.append({
-                "entry_time": now.dt.strftime("%Y-%m-%d %H:%M:%S"),
-                "exit_time": exit_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "symbol": SYMBOL,
-                "side": "sell",
-                "entry_price": round(entry_price, 5),
-                "tp": round(tp, 5),
-                "sl": round(sl, 5),
-                "exit_price": round(exit_price, 5),
-                "result": result,
-                "pnl": pnl
-            })
-
+    mask = store.session_mask(trading_start, trading_end, TIMEZONE)
+    signals = detect_entries(close, high, low, ma_period, mask, stop=len(candles) - 60,
+                             ma=store.ma(ma_period))
+
+    entry_prices = close[signals]
+    tps = entry_prices - tp_pips * PIP_SCALE
+    sls = entry_prices + sl_pips * PIP_SCALE
+    codes, exit_idx, pnls = resolve_exits(
+        high, low, signals, tps, sls,
+        win_pnl=tp_pips * LOT_SIZE * PIP_VALUE_PER_LOT,
+        loss_pnl=-sl_pips * LOT_SIZE * PIP_VALUE_PER_LOT,
+    )
+    exit_prices = np.where(codes == WIN, tps, np.where(codes == LOSS, sls, entry_prices))
+
+    # Per-minute-of-day trade counts, bucketed on integer codes
+    entry_minutes = calendar.minute_of_day[signals]
+    trades_by_minute = np.bincount(entry_minutes, minlength=MINUTES_PER_DAY)
+    wins_by_minute = np.bincount(entry_minutes[codes == WIN], minlength=MINUTES_PER_DAY)
+    losses_by_minute = np.bincount(entry_minutes[codes == LOSS], minlength=MINUTES_PER_DAY)
+
+    for entry_time, exit_time, j, code, entry_price, tp, sl, exit_price, pnl in zip(
+            calendar.format_local(signals), calendar.format_local(exit_idx), exit_idx.tolist(),
+            codes.tolist(), entry_prices.tolist(), tps.tolist(), sls.tolist(),
+            exit_prices.tolist(), pnls.tolist()):
+        cumulative_profit += pnl
+        balance_history.append((j, cumulative_profit))
+
+        entries.append({
+            "entry_time": entry_time,
+            "exit_time": exit_time,
+            "symbol": SYMBOL,
+            "side": "sell",
+            "entry_price": round(entry_price, 5),
+            "tp": round(tp, 5),
+            "sl": round(sl, 5),
+            "exit_price": round(exit_price, 5),
+            "result": RESULT_NAMES[code],
+            "pnl": pnl
+        })
+
+    # output_csv / performance_log may be None to skip writing (e.g. optimizer workers)
     if entries:
-        with open(output_csv, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=entries[0].keys())
-            writer.writeheader()
-            writer.writerows(entries)
-
-        with open(performance_log, "w", newline="") as f:
-            writer = csv.writer(f)
-            writer.writerow(["HourBlock", "Trades", "Wins", "Losses", "WinRate(%)"])
-            for hour in sorted(profit_by_time):
-                stats = profit_by_time[hour]
-                trades = stats["trades"]
-                wins = stats["wins"]
-                losses = stats["losses"]
-                win_rate = (wins / trades * 100) if trades else 0
-                writer.writerow([hour, trades, wins, losses, f"{win_rate:.2f}"])
+        if output_csv:
+            with open(output_csv, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=entries[0].keys())
+                writer.writeheader()
+                writer.writerows(entries)
+
+        if performance_log:
+            with open(performance_log, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["HourBlock", "Trades", "Wins", "Losses", "WinRate(%)"])
+                for minute in np.flatnonzero(trades_by_minute).tolist():
+                    trades = int(trades_by_minute[minute])
+                    wins = int(wins_by_minute[minute])
+                    losses = int(losses_by_minute[minute])
+                    win_rate = (wins / trades * 100) if trades else 0
+                    writer.writerow([minute_label(minute), trades, wins, losses, f"{win_rate:.2f}"])
 
         if balance_history and equity_curve_png and not silent:
-            x_vals = [t[0] for t in balance_history]
+            x_vals = calendar.local_datetimes([t[0] for t in balance_history])
             y_vals = [t[1] for t in balance_history]
 
             plt.figure(figsize=(10, 5))
@@ -157,6 +124,9 @@ if __name__ == "__main__":
 
 
 def is_near_sr(price, zones, tolerance=0.002):
-    nearby = [level for level in zones['support'] + zones['resistance'] if abs(price - level) < price * tolerance]
+    index = zones.get('index')
+    if index is None:
+        index = LevelIndex.from_zones(zones)
+    nearby = index.within(price, price * tolerance, inclusive=False)
     print(f"Checking proximity: price={price:.5f}, near={nearby}")
     return len(nearby) > 0
@@ -1,6 +1,9 @@
 
 import pandas as pd
 import matplotlib.pyplot as plt
+from candle_cache import load_candle_frame
+from portfolio_sim import PortfolioSimulator
+from signal_engine import lagged_ma_signals
 
 DATA_PATH = "usdjpy_m1.csv"
 TRADES_CSV = "simulated_trades.csv"
@@ -16,79 +19,33 @@ LEVERAGE = 2000
 CONTRACT_SIZE = 100000
 STOP_OUT_LEVEL = 25  # percent
 
-df = pd.read_csv(DATA_PATH)
-df['Timestamp'] = pd.to_datetime(df['Date'].astype(str) + ' ' + df['Timestamp'].astype(str))
-df.set_index('Timestamp', inplace=True)
+df = load_candle_frame(DATA_PATH)
 df['MA'] = df['Close'].rolling(MA_PERIOD).mean()
 
-trades = []
-open_trades = []
-balance = INITIAL_BALANCE
-
-for i in range(MA_PERIOD + 2, len(df)):
-    now = df.iloc[i]
-    prev = df.iloc[i - 1]
-    prev2 = df.iloc[i - 2]
-    time = df.index[i]
-    price = now['Close']
-
-    # update floating PnL, margin, equity
-    floating_pnl = 0
-    margin_used = 0
-    still_open = []
-
-    for trade in open_trades:
-        high = max(trade['highest_price'], now['High'])
-        tsl = high - TSL_PIPS * PIP_SIZE
-        trade['highest_price'] = high
-
-        if price <= tsl:
-            pnl_pips = (trade['entry_price'] - price) / PIP_SIZE
-            pnl = round(pnl_pips * PIP_VALUE, 2)
-            trades.append({
-                'entry_time': trade['entry_time'],
-                'exit_time': time,
-                'entry_price': trade['entry_price'],
-                'exit_price': price,
-                'pnl': pnl
-            })
-            balance += pnl
-        else:
-            trade['pnl'] = (trade['entry_price'] - price) * (CONTRACT_SIZE * 0.01) / 10000
-            floating_pnl += trade['pnl']
-            margin_used += (0.01 * CONTRACT_SIZE) / LEVERAGE
-            still_open.append(trade)
-
-    open_trades = still_open
-    equity = balance + floating_pnl
-    margin_level = (equity / margin_used) * 100 if margin_used > 0 else float('inf')
-    free_margin = equity - margin_used
-
-    # margin stop-out
-    if margin_level < STOP_OUT_LEVEL:
-        balance = equity
-        open_trades = []
-        continue
-
-    # avoid duplicate entries per candle
-    if any(trade['entry_time'] == time for trade in open_trades):
-        continue
-
-    broke_below_ma = prev2['Close'] > prev2['MA'] and prev['Close'] < prev['MA']
-    retested_ma = prev['High'] >= prev['MA']
-    broke_prev_lows = now['Low'] < min(prev['Low'], prev2['Low'])
-
-    if broke_below_ma and retested_ma and broke_prev_lows and len(open_trades) < MAX_OPEN_TRADES:
-        margin_required = (0.01 * CONTRACT_SIZE) / LEVERAGE
-        if free_margin >= margin_required:
-            entry = price
-            trade = {
-                'entry_time': time,
-                'entry_price': entry,
-                'highest_price': entry,
-                'pnl': 0
-            }
-            open_trades.append(trade)
+simulator = PortfolioSimulator(
+    initial_balance=INITIAL_BALANCE,
+    max_open_trades=MAX_OPEN_TRADES,
+    pip_size=PIP_SIZE,
+    pip_value=PIP_VALUE,
+    leverage=LEVERAGE,
+    contract_size=CONTRACT_SIZE,
+    stop_out_level=STOP_OUT_LEVEL,
+    tsl_pips=TSL_PIPS,
+    trailing="bar_high",
+    mark_to_market="contract",
+    equity_includes_exits=False,
+    stop_out="liquidate",
+)
+signals = lagged_ma_signals(df['Close'].values, df['High'].values, df['Low'].values, df['MA'].values)
+result = simulator.run(df.index.values, df['High'].values, df['Close'].values, signals, start=MA_PERIOD + 2)
+
+trades = [{
+    'entry_time': df.index[t['entry_index']],
+    'exit_time': df.index[t['exit_index']],
+    'entry_price': t['entry_price'],
+    'exit_price': t['exit_price'],
+    'pnl': t['pnl']
+} for t in result['trades']]
 
 df_trades = pd.DataFrame(trades)
 if not df_trades.empty:
@@ -0,0 +1,81 @@
+"""
+Sorted support/resistance level index.
+
+Answers "is any level within N" and "nearest level" with a binary search
+instead of scanning every level. Because float distances are monotonic on
+each side of a price, checking the two neighbouring levels gives exactly the
+same answer as ``any(abs(price - level) <= tolerance for level in levels)``.
+"""
+from bisect import bisect_left
+
+import numpy as np
+
+
+class LevelIndex:
+    def __init__(self, levels):
+        levels = np.asarray(levels, dtype=np.float64).ravel()
+        self.levels = np.sort(levels[~np.isnan(levels)])
+        self._levels = self.levels.tolist()  # bisect on a list beats numpy scalar calls
+
+    @classmethod
+    def from_zones(cls, zones):
+        return cls(list(zones["support"]) + list(zones["resistance"]))
+
+    def __len__(self):
+        return len(self._levels)
+
+    def _neighbours(self, price):
+        pos = bisect_left(self._levels, price)
+        return self._levels[max(pos - 1, 0):pos + 1]
+
+    def nearest(self, price):
+        """Closest level to ``price`` (the lower one on a tie), or None if empty."""
+        candidates = self._neighbours(price)
+        return min(candidates, key=lambda level: abs(price - level)) if candidates else None
+
+    def is_near(self, price, tolerance, inclusive=True):
+        """True if any level lies within ``tolerance`` of ``price``."""
+        return any(self._accept(abs(price - level), tolerance, inclusive)
+                   for level in self._neighbours(price))
+
+    def within(self, price, tolerance, inclusive=True):
+        """All levels within ``tolerance`` of ``price``, in ascending order."""
+        lo = bisect_left(self._levels, price)
+        hi = lo
+        while lo > 0 and self._accept(price - self._levels[lo - 1], tolerance, inclusive):
+            lo -= 1
+        while hi < len(self._levels) and self._accept(self._levels[hi] - price, tolerance, inclusive):
+            hi += 1
+        return self._levels[lo:hi]
+
+    @staticmethod
+    def _accept(distance, tolerance, inclusive):
+        return distance < tolerance or (inclusive and distance == tolerance)
+
+    # ------------------------------------------------------------------- batch queries
+    def _neighbour_distances(self, prices):
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(self.levels) == 0:
+            inf = np.full(prices.shape, np.inf)
+            return prices, inf, inf, np.zeros(prices.shape, dtype=np.int64)
+        pos = np.searchsorted(self.levels, prices, side="left")
+        below = self.levels[np.clip(pos - 1, 0, len(self.levels) - 1)]
+        above = self.levels[np.clip(pos, 0, len(self.levels) - 1)]
+        dist_below = np.where(pos > 0, np.abs(prices - below), np.inf)
+        dist_above = np.where(pos < len(self.levels), np.abs(prices - above), np.inf)
+        return prices, dist_below, dist_above, pos
+
+    def near_mask(self, prices, tolerance, inclusive=True):
+        """Vectorized :meth:`is_near` over an array of prices."""
+        _, dist_below, dist_above, _ = self._neighbour_distances(prices)
+        nearest = np.minimum(dist_below, dist_above)
+        return nearest <= tolerance if inclusive else nearest < tolerance
+
+    def nearest_many(self, prices):
+        """Vectorized :meth:`nearest`; NaN where the index is empty."""
+        prices, dist_below, dist_above, pos = self._neighbour_distances(prices)
+        if len(self.levels) == 0:
+            return np.full(prices.shape, np.nan)
+        use_below = dist_below <= dist_above
+        idx = np.where(use_below, pos - 1, pos).clip(0, len(self.levels) - 1)
+        return self.levels[idx]
@@ -1,16 +1,24 @@
 
+import os
 import random
 import csv
 import matplotlib.pyplot as plt
-from simulate_pnl import simulate_strategy
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from simulate_pnl import simulate_strategy, DATA_PATH, SIMULATOR_VERSION
+from indicator_store import get_store
+from fitness_cache import FitnessCache
 
 POPULATION_SIZE = 10
 GENERATIONS = 20
 MUTATION_RATE = 0.2
+MA_PERIOD_RANGE = (5, 20)
+WORKERS = os.cpu_count() or 1   # 1 = evaluate in-process
+SEED = None
 
 def random_params():
     return {
-        "ma_period": random.randint(5, 20),
+        "ma_period": random.randint(*MA_PERIOD_RANGE),
         "tp_pips": random.randint(10, 50),
         "sl_pips": random.randint(5, 50),
     }
@@ -18,7 +26,7 @@ def random_params():
 def mutate(params):
     new_params = params.copy()
     if random.random() < MUTATION_RATE:
-        new_params["ma_period"] = random.randint(5, 20)
+        new_params["ma_period"] = random.randint(*MA_PERIOD_RANGE)
     if random.random() < MUTATION_RATE:
         new_params["tp_pips"] = random.randint(10, 50)
     if random.random() < MUTATION_RATE:
@@ -32,33 +40,96 @@ def crossover(p1, p2):
         "sl_pips": random.choice([p1["sl_pips"], p2["sl_pips"]]),
     }
 
-def evaluate(params):
+def evaluate(params, store=None):
     print(f"Evaluating: {params}")
+    # Scoring only needs the PnL; skipping the CSVs keeps parallel workers from clobbering each other
     result = simulate_strategy(
         ma_period=params["ma_period"],
         tp_pips=params["tp_pips"],
         sl_pips=params["sl_pips"],
-        output_csv="simulated_trades.csv",
-        performance_log="timeblock_profit.csv",
+        output_csv=None,
+        performance_log=None,
         equity_curve_png=None,
-        silent=True
+        silent=True,
+        store=store
     )
     return result.get("total_pnl", 0) if result else 0
 
-def evolve():
+# ------------------------------------------------------------------- worker pool
+_worker_store = None
+
+def _init_worker(data_path):
+    # Workers memory-map the candle cache built by the parent, so the OS shares
+    # one copy of the pages and nothing re-reads the CSV
+    global _worker_store
+    _worker_store = get_store(data_path)
+
+def _evaluate_in_worker(params):
+    return evaluate(params, _worker_store)
+
+def score_population(population, store, pool=None, cache=None):
+    """Return (individual, score) pairs in population order plus the number simulated.
+
+    Individuals already in ``cache`` (or repeated within the population) are
+    not simulated again.
+    """
+    known = {}
+    todo = []
+    for ind in population:
+        key = FitnessCache.key(ind)
+        if key in known:
+            continue
+        known[key] = cache.get(ind) if cache is not None else None
+        if known[key] is None:
+            todo.append(ind)
+
+    if pool is None:
+        results = [evaluate(ind, store) for ind in todo]
+    else:
+        results = list(pool.map(_evaluate_in_worker, todo))
+    if cache is not None:
+        cache.put_many(zip(todo, results))
+    for ind, score in zip(todo, results):
+        known[FitnessCache.key(ind)] = score
+
+    return [(ind, known[FitnessCache.key(ind)]) for ind in population], len(todo)
+
+def write_outputs(params, store):
+    """Re-run ``params`` once with the default output paths (simulated_trades.csv,
+    timeblock_profit.csv, equity_curve.png) that the other scripts read."""
+    return simulate_strategy(ma_period=params["ma_period"], tp_pips=params["tp_pips"],
+                             sl_pips=params["sl_pips"], store=store)
+
+def evolve(workers=WORKERS, seed=SEED, use_cache=True):
+    if seed is not None:
+        random.seed(seed)
+
+    # Build the candle cache before any worker starts; serial runs also warm every MA variant
+    store = get_store(DATA_PATH)
+    cache = FitnessCache(store.fingerprint, SIMULATOR_VERSION) if use_cache else None
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=min(workers, POPULATION_SIZE),
+                                   initializer=_init_worker, initargs=(DATA_PATH,))
+    else:
+        store.warm("ma", range(MA_PERIOD_RANGE[0], MA_PERIOD_RANGE[1] + 1))
+
     population = [random_params() for _ in range(POPULATION_SIZE)]
     history = []
 
-    with open("generation_log.csv", "w", newline="") as logf:
+    with pool or nullcontext(), open("generation_log.csv", "w", newline="") as logf:
         writer = csv.writer(logf)
-        writer.writerow(["Generation", "BestPnL", "BestParams"])
+        writer.writerow(["Generation", "BestPnL", "BestParams", "Simulated", "CacheHits", "CacheHitRate(%)"])
 
         for gen in range(1, GENERATIONS + 1):
-            scores = [(ind, evaluate(ind)) for ind in population]
+            scores, simulated = score_population(population, store, pool, cache)
             scores.sort(key=lambda x: x[1], reverse=True)
             best_individual, best_score = scores[0]
-            writer.writerow([gen, best_score, best_individual])
-            print(f"Generation {gen}: Best PnL = ${best_score:.2f} with Params = {best_individual}")
+            hits = len(population) - simulated
+            hit_rate = hits / len(population) * 100
+            writer.writerow([gen, best_score, best_individual, simulated, hits, f"{hit_rate:.2f}"])
+            print(f"Generation {gen}: Best PnL = ${best_score:.2f} with Params = {best_individual} "
+                  f"(cache hits {hits}/{len(population)})")
             history.append(best_score)
 
             next_gen = [best_individual]
@@ -69,6 +140,10 @@ def evolve():
                 next_gen.append(child)
             population = next_gen
 
+    # evaluate() writes no files, so leave the best individual's trades behind as before
+    print(f"Writing outputs for the best individual {best_individual}")
+    write_outputs(best_individual, store)
+
     plt.plot(range(1, GENERATIONS + 1), history, marker="o")
     plt.xlabel("Generation")
     plt.ylabel("Best Total PnL ($)")
@@ -1,5 +1,12 @@
 
+import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sr_index import LevelIndex
+
+# Slack on the "too far below to ever match again" test so float rounding can
+# never retire a cluster the original linear scan would still have matched
+STALE_CLUSTER_MARGIN = 1 + 1e-9
 
 def downsample(df, timeframe):
     df = df.copy()
@@ -23,19 +30,21 @@ def detect_swing_highs_lows(df, window=3):
     lows = df['low'].values
     dates = df['datetime'].values
 
-    swing_highs = []
-    swing_lows = []
+    if len(df) < 2 * window + 1:
+        return [], []
 
-    for i in range(window, len(df) - window):
-        local_high = highs[i]
-        local_low = lows[i]
-        is_high = all(local_high > highs[i - j] for j in range(1, window + 1)) and                   all(local_high > highs[i + j] for j in range(1, window + 1))
-        is_low = all(local_low < lows[i - j] for j in range(1, window + 1)) and                  all(local_low < lows[i + j] for j in range(1, window + 1))
+    # Each row is bars i-window .. i+window; the centre must strictly beat both sides
+    high_win = sliding_window_view(highs, 2 * window + 1)
+    low_win = sliding_window_view(lows, 2 * window + 1)
+    centre_high = high_win[:, window]
+    centre_low = low_win[:, window]
+    is_high = (centre_high > high_win[:, :window].max(axis=1)) & (centre_high > high_win[:, window + 1:].max(axis=1))
+    is_low = (centre_low < low_win[:, :window].min(axis=1)) & (centre_low < low_win[:, window + 1:].min(axis=1))
 
-        if is_high:
-            swing_highs.append((dates[i], local_high))
-        if is_low:
-            swing_lows.append((dates[i], local_low))
+    high_idx = np.flatnonzero(is_high) + window
+    low_idx = np.flatnonzero(is_low) + window
+    swing_highs = list(zip(dates[high_idx], highs[high_idx]))
+    swing_lows = list(zip(dates[low_idx], lows[low_idx]))
 
     return swing_highs, swing_lows
 
@@ -48,25 +57,42 @@ def get_support_resistance_zones(df, timeframes=['1h', '4h', '1d'], window=3, cl
         raw_levels.extend([price for _, price in highs])
         raw_levels.extend([price for _, price in lows])
 
-    # Cluster similar levels together
+    # Cluster similar levels together: a level joins the first (oldest) cluster
+    # whose running average is within tolerance. Levels arrive sorted, so once a
+    # cluster falls more than the tolerance below the current level it can never
+    # match again and drops out of the active set.
     raw_levels.sort()
     clustered_zones = []
+    sums = []
+    active = []
 
     for level in raw_levels:
-        found = False
-        for cluster in clustered_zones:
-            if abs(level - cluster['level']) <= level * cluster_threshold:
-                cluster['touches'] += 1
-                cluster['members'].append(level)
-                cluster['level'] = sum(cluster['members']) / len(cluster['members'])  # update average
-                found = True
-                break
-        if not found:
+        tolerance = level * cluster_threshold
+        target = None
+        still_active = []
+        for idx in active:
+            cluster = clustered_zones[idx]
+            if level - cluster['level'] > tolerance * STALE_CLUSTER_MARGIN:
+                continue
+            still_active.append(idx)
+            if target is None and abs(level - cluster['level']) <= tolerance:
+                target = idx
+        active = still_active
+
+        if target is not None:
+            cluster = clustered_zones[target]
+            cluster['touches'] += 1
+            cluster['members'].append(level)
+            sums[target] += level
+            cluster['level'] = sums[target] / len(cluster['members'])  # update average
+        else:
             clustered_zones.append({
                 'level': level,
                 'touches': 1,
                 'members': [level]
             })
+            sums.append(0 + level)
+            active.append(len(clustered_zones) - 1)
 
     support = [z['level'] for z in clustered_zones if z['touches'] >= 2]
     resistance = [z['level'] for z in clustered_zones if z['touches'] >= 2]
@@ -74,7 +100,8 @@ def get_support_resistance_zones(df, timeframes=['1h', '4h', '1d'], window=3, cl
     zones = {
         'support': support,
         'resistance': resistance,
-        'scored_zones': clustered_zones
+        'scored_zones': clustered_zones,
+        'index': LevelIndex(support + resistance)  # O(log n) proximity lookups
     }
 
     return zones
@@ -0,0 +1,174 @@
+"""
+Live tick-to-bar aggregation for the bridge.
+
+Ticks are folded into OHLC bars per timeframe (bid prices, like the
+``candles_m1`` aggregate) as the tick tailer reads them. Completed bars go
+into a fixed-size NumPy ring buffer that writes every bar twice - at ``i``
+and ``i + capacity`` - so the latest ``n`` bars are always one contiguous
+slice and ``BarRing.window`` returns views without copying.
+
+Each completed M1 bar also feeds ``LiveSignal``, which keeps a running sum of
+the last ``ma_period`` closes and the last three bars, so the MA-break /
+retest / low-break sell setup of ``backtest/signal_engine.py`` is evaluated
+in O(1) per bar.
+"""
+import datetime
+import statistics
+import threading
+from collections import deque
+
+import numpy as np
+import pytz
+
+TIMEFRAMES = {"M1": 60, "M5": 300, "M15": 900, "H1": 3600}
+DEFAULT_CAPACITY = 10_000
+COLUMNS = ("open", "high", "low", "close")
+MA_TIE_EPSILON = 1e-9   # same tie re-check as signal_engine.detect_entries
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def tick_seconds(stamp, tz=pytz.utc):
+    """Epoch seconds of an EA ``YYYY-MM-DD HH:MM:SS`` stamp written in ``tz``."""
+    dt = datetime.datetime.fromisoformat(stamp)
+    if tz is not pytz.utc:
+        dt = tz.localize(dt).astimezone(pytz.utc).replace(tzinfo=None)
+    return int((dt - EPOCH).total_seconds())
+
+
+class BarRing:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.ts = np.zeros(2 * capacity, dtype=np.int64)      # bar open, epoch seconds UTC
+        self.prices = np.zeros((4, 2 * capacity), dtype=np.float64)
+        self.ticks = np.zeros(2 * capacity, dtype=np.int32)
+        self.count = 0    # bars ever appended
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, ts, open_, high, low, close, ticks):
+        k = self.count % self.capacity
+        for pos in (k, k + self.capacity):
+            self.ts[pos] = ts
+            self.prices[:, pos] = (open_, high, low, close)
+            self.ticks[pos] = ticks
+        self.count += 1
+
+    def window(self, n=None):
+        """Views of the last ``n`` bars, oldest first: ``(ts, prices[4, n], ticks)``."""
+        n = len(self) if n is None else max(0, min(n, len(self)))
+        end = self.count % self.capacity + (self.capacity if self.count >= self.capacity else 0)
+        return self.ts[end - n:end], self.prices[:, end - n:end], self.ticks[end - n:end]
+
+
+class LiveSignal:
+    """Incremental version of ``signal_engine.detect_entries`` for one bar at a time."""
+
+    def __init__(self, ma_period=10, session_start=None, session_end=None, session_tz=None):
+        self.ma_period = ma_period
+        self.session_start = session_start
+        self.session_end = session_end
+        self.session_tz = session_tz
+        self._closes = deque()
+        self._sum = 0.0
+        self._recent = deque(maxlen=3)   # (close, high, low) of the last bars
+        self.ma = None
+        self.last = None                 # state after the latest completed bar
+
+    def in_session(self, ts):
+        if self.session_tz is None:
+            return True
+        local = datetime.datetime.fromtimestamp(ts, self.session_tz).time()
+        return self.session_start <= local <= self.session_end
+
+    def update(self, ts, high, low, close):
+        """Feed completed bar ``i``; returns True if the sell setup triggers on it."""
+        # ma = mean(close[i - period:i]), i.e. over the bars before this one
+        self.ma = self._sum / self.ma_period if len(self._closes) == self.ma_period else None
+        signal = False
+        if self.ma is not None and len(self._recent) >= 2:
+            (c2, _, l2), (c1, h1, l1) = self._recent[-2], self._recent[-1]
+            if low < min(l1, l2) and self.in_session(ts):
+                ma = self.ma
+                if min(abs(c2 - ma), abs(c1 - ma), abs(h1 - ma)) <= MA_TIE_EPSILON:
+                    ma = statistics.mean(self._closes)  # running sum is a few ulps off
+                signal = c2 > ma and c1 < ma and h1 >= ma
+
+        self._recent.append((close, high, low))
+        self._closes.append(close)
+        self._sum += close
+        if len(self._closes) > self.ma_period:
+            self._sum -= self._closes.popleft()
+        self.last = {"ts": ts, "ma": self.ma, "signal": signal, "close": close}
+        return signal
+
+
+class BarBuilder:
+    """Folds ticks into bars of ``seconds`` and appends completed bars to a ring."""
+
+    def __init__(self, name, seconds, capacity=DEFAULT_CAPACITY, signal=None):
+        self.name = name
+        self.seconds = seconds
+        self.ring = BarRing(capacity)
+        self.signal = signal
+        self.bucket = None
+        self.bar = None          # [open, high, low, close, ticks] of the forming bar
+        self.late_ticks = 0
+
+    def update(self, ts, price):
+        bucket = ts - ts % self.seconds
+        if self.bucket is None or bucket > self.bucket:
+            self.close_bar()
+            self.bucket, self.bar = bucket, [price, price, price, price, 1]
+        elif bucket < self.bucket:
+            self.late_ticks += 1   # bar already closed
+        else:
+            bar = self.bar
+            bar[1] = max(bar[1], price)
+            bar[2] = min(bar[2], price)
+            bar[3] = price
+            bar[4] += 1
+
+    def close_bar(self):
+        if self.bar is None:
+            return
+        self.ring.append(self.bucket, *self.bar)
+        if self.signal is not None:
+            self.signal.update(self.bucket, self.bar[1], self.bar[2], self.bar[3])
+        self.bar = None
+
+
+class BarAggregator:
+    def __init__(self, timeframes=("M1",), capacity=DEFAULT_CAPACITY, signal=None, tick_tz=pytz.utc):
+        self.tick_tz = tick_tz
+        self.builders = {
+            tf: BarBuilder(tf, TIMEFRAMES[tf], capacity, signal if tf == "M1" else None)
+            for tf in timeframes
+        }
+        self.signal = signal
+        self.bad_ticks = 0
+        self._lock = threading.Lock()
+
+    def add_ticks(self, rows):
+        """Fold tick rows ``(time, bid, ask, spread)`` into every timeframe."""
+        with self._lock:
+            for stamp, bid, *_ in rows:
+                try:
+                    ts, price = tick_seconds(stamp, self.tick_tz), float(bid)
+                except ValueError:
+                    self.bad_ticks += 1
+                    continue
+                for builder in self.builders.values():
+                    builder.update(ts, price)
+
+    def bars(self, tf="M1", n=None):
+        builder = self.builders[tf]
+        with self._lock:
+            ts, prices, ticks = builder.ring.window(n)
+            out = {"tf": tf, "ts": ts.tolist(), "ticks": ticks.tolist()}
+            for name, col in zip(COLUMNS, prices):
+                out[name] = col.tolist()
+            out["forming"] = (None if builder.bar is None else
+                              dict(zip(("ts",) + COLUMNS + ("ticks",), [builder.bucket] + builder.bar)))
+        return out
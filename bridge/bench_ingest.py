@@ -0,0 +1,103 @@
+"""
+Tick ingest benchmark against a local Postgres/TimescaleDB.
+
+    docker compose -f docker/timescaledb-compose.yml up -d
+    cd bridge && python bench_ingest.py [batched_rows] [single_rows]
+
+Compares the old path (INSERT + COMMIT per tick) with the ingest writer's
+micro-batched COPY, writing into a scratch copy of the ticks table.
+"""
+import datetime
+import functools
+import pathlib
+import queue
+import random
+import sys
+import time
+
+import psycopg2
+import tomli
+
+from db import Database, DEFAULT_DSN
+from ingest import BatchWriter, copy_ticks
+
+CONFIG = tomli.load(open(pathlib.Path(__file__).with_name("main.toml"), "rb"))
+DB_DSN = CONFIG.get("db", {}).get("dsn", DEFAULT_DSN)
+TABLE = "bench_ticks"
+
+
+def make_ticks(n):
+    t = datetime.datetime(2025, 5, 26, 14, 0, 0)
+    bid = 142.778
+    rows = []
+    for i in range(n):
+        bid = round(bid + random.uniform(-0.005, 0.005), 3)
+        rows.append([(t + datetime.timedelta(milliseconds=50 * i)).strftime("%Y-%m-%d %H:%M:%S"),
+                     f"{bid:.3f}", f"{bid + 0.01:.3f}", "10.0"])
+    return rows
+
+
+def reset_table(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"CREATE TABLE {TABLE} (LIKE ticks INCLUDING ALL)")
+    conn.commit()
+
+
+def count_rows(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        return cur.fetchone()[0]
+
+
+def bench_single(conn, rows):
+    start = time.perf_counter()
+    with conn.cursor() as cur:
+        for r in rows:
+            cur.execute(f"INSERT INTO {TABLE} VALUES (%s,%s,%s,%s)", r)
+            conn.commit()
+    return len(rows) / (time.perf_counter() - start)
+
+
+def bench_batched(rows, chunk=200):
+    source = queue.Queue()
+    db = Database(DB_DSN, 1, 1, "bench")
+    writer = BatchWriter(source, db, functools.partial(copy_ticks, table=TABLE), "ticks")
+    start = time.perf_counter()
+    writer.start()
+    for i in range(0, len(rows), chunk):  # arrive in tailer-sized chunks
+        source.put((rows[i:i + chunk], None))
+    writer.stop()
+    db.close()
+    return len(rows) / (time.perf_counter() - start)
+
+
+def main():
+    batched_n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    single_n = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+    conn = psycopg2.connect(DB_DSN)
+    with conn.cursor() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS ticks(ts TIMESTAMPTZ, bid DOUBLE PRECISION, "
+                    "ask DOUBLE PRECISION, spread DOUBLE PRECISION)")
+    conn.commit()
+
+    reset_table(conn)
+    single = bench_single(conn, make_ticks(single_n))
+    assert count_rows(conn) == single_n
+
+    reset_table(conn)
+    batched = bench_batched(make_ticks(batched_n))
+    assert count_rows(conn) == batched_n
+
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE {TABLE}")
+    conn.commit()
+
+    print(f"INSERT+COMMIT per tick : {single:>10,.0f} ticks/s  ({single_n:,} rows)")
+    print(f"batched COPY           : {batched:>10,.0f} ticks/s  ({batched_n:,} rows)")
+    print(f"speed-up               : {batched / single:>10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Startup-time check for the bridge.
+
+Starts ``uvicorn main:create_app --factory`` in a subprocess against an
+unreachable database and an empty MT4 Files directory, and measures
+
+    import   : ``import main`` in a fresh interpreter (must not touch the DB)
+    http up  : process start -> first answer from GET /health
+    warming  : /order answers 503 while the risk state is not loaded
+
+Exits non-zero if the port takes longer than ``--max-seconds`` to come up.
+
+    cd bridge && python bench_startup.py [--max-seconds 1.0]
+"""
+import argparse
+import json
+import os
+import pathlib
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BRIDGE_DIR = pathlib.Path(__file__).parent
+UNREACHABLE_DSN = "dbname=edgeflow user=postgres host=127.0.0.1 port=1 connect_timeout=1"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def write_config(tmp):
+    files = pathlib.Path(tmp, "Files")
+    files.mkdir()
+    path = pathlib.Path(tmp, "bridge.toml")
+    path.write_text(
+        f'[mt4]\nfiles_path = {json.dumps(str(files))}\n\n'
+        f'[db]\ndsn = "{UNREACHABLE_DSN}"\n\n'
+        f'[ingest]\ncheckpoint_dir = {json.dumps(str(pathlib.Path(tmp, "state")))}\n\n'
+        f'[metrics]\nlog_level = "WARNING"\n'
+    )
+    return path
+
+
+def time_import():
+    out = subprocess.run(
+        [sys.executable, "-c", "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"],
+        cwd=BRIDGE_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def request(url, data=None):
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=1) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read())
+
+
+def time_http_up(config, port, timeout):
+    env = {**os.environ, "BRIDGE_CONFIG": str(config)}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BRIDGE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        while True:
+            try:
+                status, health = request(base + "/health")
+                up = time.perf_counter() - start
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if proc.poll() is not None:
+                    raise SystemExit(f"bridge exited during startup:\n{proc.stderr.read().decode()}")
+                if time.perf_counter() - start > timeout:
+                    raise SystemExit(f"bridge did not answer within {timeout}s")
+                time.sleep(0.01)
+        order = json.dumps({"symbol": "USDJPY", "side": "sell", "lot": 0.01}).encode()
+        order_status, _ = request(base + "/order", order)
+        return up, health, order_status
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-seconds", type=float, default=1.0, help="fail if the port is not up within this")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = write_config(tmp)
+        imported = time_import()
+        up, health, order_status = time_http_up(config, free_port(), timeout=10 * args.max_seconds)
+
+    print(f"import main            : {imported:>7.3f}s")
+    print(f"HTTP up (DB down)      : {up:>7.3f}s   /health -> {health['status']}")
+    print(f"/order while warming   : {order_status}")
+    ok = up <= args.max_seconds and health["status"] != "ready" and order_status == 503
+    print("PASS" if ok else f"FAIL (limit {args.max_seconds:.2f}s)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Bootstrap check for bridge/schema.py against a real Postgres server.
+
+Creates a throwaway database on the server in ``--dsn`` and, in it,
+
+    fresh     : bootstrap() on an empty database, twice (must be idempotent)
+    key       : executions primary key is (ticket, kind)
+    insert    : open + close rows of one ticket are stored, a repeat is skipped
+    notify    : the insert trigger announces rows, with their kind
+    migrate   : a pre-v0.4 executions table (ticket primary key, no kind) is
+                upgraded in place and keeps its rows
+
+then drops the database again. Exits non-zero on the first failure.
+
+    cd bridge && python check_schema.py [--dsn "user=postgres host=localhost"]
+"""
+import argparse
+import json
+import os
+import select
+import sys
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+
+import schema
+from db import DEFAULT_DSN
+from ingest import exec_row, insert_executions
+
+CHECK_DB = f"edgeflow_schema_check_{os.getpid()}"
+
+LEGACY_EXECUTIONS_SQL = """
+CREATE TABLE executions(
+  ticket  BIGINT PRIMARY KEY,
+  ts      TIMESTAMPTZ,
+  symbol  TEXT,
+  side    TEXT,
+  lot     DOUBLE PRECISION,
+  price   DOUBLE PRECISION
+)"""
+
+ROWS = [
+    ["1001", "2025-05-26 14:08:02", "USDJPY", "buy", "0.25", "142.784"],
+    ["1001", "2025-05-26 14:31:47", "USDJPY", "buy", "0.25", "142.934", "tp"],
+]
+
+
+def admin(dsn, sql):
+    conn = psycopg2.connect(make_dsn(dsn, dbname="postgres"))
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql)
+    finally:
+        conn.close()
+
+
+def primary_key(cur):
+    cur.execute("SELECT a.attname FROM pg_index i "
+                "JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey) "
+                "WHERE i.indrelid = 'executions'::regclass AND i.indisprimary ORDER BY a.attname")
+    return tuple(name for name, in cur.fetchall())
+
+
+def check(name, ok, detail=""):
+    print(f"{name:<9}: {'ok' if ok else 'FAILED'} {detail}".rstrip())
+    if not ok:
+        raise SystemExit(1)
+
+
+def run(dsn):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        schema.bootstrap(dsn)
+        schema.bootstrap(dsn)
+        check("fresh", True)
+        with conn.cursor() as cur:
+            check("key", primary_key(cur) == ("kind", "ticket"), str(primary_key(cur)))
+
+            cur.execute("LISTEN executions")
+            insert_executions(conn, [tuple(exec_row(row)) for row in ROWS])
+            insert_executions(conn, [tuple(exec_row(ROWS[0]))])
+            cur.execute("SELECT kind FROM executions WHERE ticket = 1001 ORDER BY ts")
+            kinds = [kind for kind, in cur.fetchall()]
+            check("insert", kinds == ["open", "tp"], str(kinds))
+
+            select.select([conn], [], [], 5)
+            conn.poll()
+            payloads = [n.payload for n in conn.notifies]
+            check("notify", [json.loads(p)["kind"] for p in payloads] == ["open", "tp"], str(payloads[-1:]))
+
+            cur.execute("DROP TABLE executions")
+            cur.execute(LEGACY_EXECUTIONS_SQL)
+            cur.execute("INSERT INTO executions VALUES (%s, %s, %s, %s, %s, %s)", ROWS[0])
+        schema.bootstrap(dsn)
+        with conn.cursor() as cur:
+            key = primary_key(cur)
+            cur.execute("SELECT count(*), min(kind) FROM executions")
+            count, kind = cur.fetchone()
+            check("migrate", key == ("kind", "ticket") and (count, kind) == (1, "open"),
+                  f"{key} rows={count} kind={kind}")
+    finally:
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dsn", default=DEFAULT_DSN, help="any database on the server to check against")
+    args = ap.parse_args()
+
+    server = {k: v for k, v in parse_dsn(args.dsn).items() if k != "dbname"}
+    admin(make_dsn(**server), f"CREATE DATABASE {CHECK_DB}")
+    try:
+        run(make_dsn(**server, dbname=CHECK_DB))
+    finally:
+        admin(make_dsn(**server), f"DROP DATABASE IF EXISTS {CHECK_DB}")
+    print("PASS")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
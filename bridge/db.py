@@ -0,0 +1,155 @@
+"""
+Pooled Postgres access for the bridge.
+
+Every DB operation checks a connection out of a ``ThreadedConnectionPool`` for
+just that operation, so API handlers and ingest writers never share a
+connection or cursor. A connection that dies (closed, or SQLSTATE class 08,
+e.g. after a database restart) is dropped from the pool and the error is
+raised as ``ConnectionLost``; any other error (a statement timeout, a
+deadlock) reaches the caller unchanged and the connection is kept. ``run``
+retries an operation on another connection after ``ConnectionLost``: at once
+while the failures are on pooled connections that went stale together, then
+up to ``retries`` times on new ones. Checkouts beyond ``maxconn`` wait for a
+free connection rather than failing with ``PoolError``.
+
+Nothing connects until first use; ``wait_ready`` blocks (with exponential
+backoff) until the server accepts connections, for startup before the DB is up.
+"""
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+DEFAULT_DSN = "dbname=edgeflow user=postgres password=postgres host=localhost port=5432"
+CONNECTION_EXCEPTION_CLASS = "08"
+RETRY_DELAY = 1.0
+BACKOFF_INITIAL = 0.5
+BACKOFF_MAX = 30.0
+
+log = logging.getLogger("bridge.db")
+
+
+class ConnectionLost(psycopg2.OperationalError):
+    """The server could not be reached or dropped the connection.
+
+    ``reused`` is True if the connection had served earlier operations, i.e.
+    it may just have gone stale in the pool.
+    """
+
+    def __init__(self, message, reused=False):
+        super().__init__(message)
+        self.reused = reused
+
+
+RECONNECT_ERRORS = (ConnectionLost,)
+
+
+def connection_lost(exc, conn=None):
+    """True if ``exc`` means the connection is gone, not that one statement failed."""
+    if isinstance(exc, (ConnectionLost, psycopg2.InterfaceError)):
+        return True
+    if not isinstance(exc, psycopg2.OperationalError):
+        return False
+    if conn is not None and conn.closed:
+        return True
+    if exc.pgcode is None:
+        return conn is None      # could not connect at all
+    return exc.pgcode.startswith(CONNECTION_EXCEPTION_CLASS)
+
+
+class Database:
+    def __init__(self, dsn, minconn=1, maxconn=4, name="db"):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.name = name
+        self.reconnects = 0
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._served = weakref.WeakSet()   # connections that completed an operation
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None or self._pool.closed:
+                self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, self.dsn)
+            return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commit on success, roll back on error."""
+        with self._slots:
+            try:
+                pool = self.pool
+                conn = pool.getconn()
+            except psycopg2.OperationalError as exc:
+                self.reconnects += 1
+                raise ConnectionLost(str(exc).strip()) from exc
+            reused = conn in self._served
+            lost = False
+            try:
+                if conn.closed:
+                    raise ConnectionLost("connection already closed", reused)
+                yield conn
+                conn.commit()
+                self._served.add(conn)
+            except Exception as exc:
+                lost = connection_lost(exc, conn)
+                if not lost:
+                    conn.rollback()
+                    self._served.add(conn)
+                    raise
+                self.reconnects += 1
+                if isinstance(exc, ConnectionLost):
+                    raise
+                raise ConnectionLost(str(exc).strip(), reused) from exc
+            finally:
+                pool.putconn(conn, close=lost or bool(conn.closed))
+
+    @contextmanager
+    def cursor(self):
+        with self.connection() as conn, conn.cursor() as cur:
+            yield cur
+
+    def run(self, fn, retries=1):
+        """Call ``fn(conn)``, retrying on another connection if the one used died."""
+        attempt = stale = 0
+        while True:
+            try:
+                with self.connection() as conn:
+                    return fn(conn)
+            except ConnectionLost as exc:
+                if exc.reused and stale < self.maxconn:
+                    stale += 1      # dropped from the pool; try the next one right away
+                    continue
+                if attempt == retries:
+                    raise
+                time.sleep(RETRY_DELAY if attempt else 0)
+                attempt += 1
+
+    def wait_ready(self, stop=None, initial=BACKOFF_INITIAL, max_delay=BACKOFF_MAX):
+        """Retry ``SELECT 1`` until it succeeds; False if ``stop`` (an Event) was set first."""
+        delay = initial
+        while stop is None or not stop.is_set():
+            try:
+                self.run(lambda conn: conn.cursor().execute("SELECT 1"), retries=0)
+                return True
+            except RECONNECT_ERRORS as exc:
+                reason = str(exc).strip().splitlines()[0] if str(exc).strip() else type(exc).__name__
+                log.warning("%s: database unavailable (%s), retrying in %.1fs", self.name, reason, delay)
+            if stop is not None:
+                stop.wait(delay)
+            else:
+                time.sleep(delay)
+            delay = min(delay * 2, max_delay)
+        return False
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
@@ -0,0 +1,91 @@
+"""
+EA stand-in for the order spool.
+
+    cd bridge && python ea_standin.py [orders] [producers] [rate]
+
+Producer threads submit orders (each client_order_id sent twice, as a
+retrying client would) to an OrderSpool in a scratch directory at ``rate``
+orders/s in total, while a consumer polls the spool the way the EA does:
+take the lowest-numbered ``*.json``, read it, delete it. Exits non-zero
+unless every order arrives exactly once, complete, and in sequence order.
+"""
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from spool import OrderSpool
+
+POLL_SECONDS = 0.005   # roughly one EA tick on a busy chart
+
+
+def next_order_file(directory):
+    names = [n for n in os.listdir(directory) if n.endswith(".json")]
+    return min(names) if names else None
+
+
+def consume(directory, received, done):
+    while True:
+        name = next_order_file(directory)
+        if name is None:
+            if done.is_set() and next_order_file(directory) is None:
+                return
+            time.sleep(POLL_SECONDS)
+            continue
+        path = os.path.join(directory, name)
+        with open(path, encoding="utf-8") as f:
+            received.append(json.loads(f.read()))  # raises on a partial file
+        os.remove(path)
+
+
+def produce(spool, ids, rate):
+    interval = 1 / rate if rate else 0
+    for client_id in ids:
+        order = {"symbol": "USDJPY", "side": "sell", "lot": 0.25, "sl": None, "tp": None,
+                 "slippage": 3, "client_order_id": client_id}
+        spool.submit(order)
+        spool.submit(order)  # retry: must be de-duplicated
+        if interval:
+            time.sleep(interval)
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    producers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0   # 0 = as fast as possible
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "orders")
+        spool = OrderSpool(directory)
+        received, done = [], threading.Event()
+        consumer = threading.Thread(target=consume, args=(directory, received, done))
+        consumer.start()
+
+        ids = [f"c{i}" for i in range(total)]
+        start = time.perf_counter()
+        threads = [threading.Thread(target=produce, args=(spool, ids[k::producers], rate / producers))
+                   for k in range(producers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        spooled = time.perf_counter() - start
+        done.set()
+        consumer.join()
+        elapsed = time.perf_counter() - start
+        spool.close()
+
+    seqs = [o["seq"] for o in received]
+    got = sorted(o["client_order_id"] for o in received)
+    ok = got == sorted(ids) and seqs == sorted(seqs) and spool.duplicates == total
+    print(f"spooled  : {total:,} orders (+{spool.duplicates:,} duplicates) in {spooled:.2f}s "
+          f"= {total / spooled:,.0f} orders/s")
+    print(f"consumed : {len(received):,} orders in {elapsed:.2f}s, in sequence order: {seqs == sorted(seqs)}")
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Staged ingestion pipeline for the bridge.
+
+    watchdog event --wake--> FileTailer --bounded queue--> BatchWriter --> Postgres
+                                 ^                              |
+                                 +------- ack (checkpoint) -----+
+
+Tailers read only complete new lines from the EA's CSV files and push parsed
+row chunks onto a bounded queue; when the queue is full the tailer simply stops
+reading (the file is the buffer), so memory stays bounded and a slow database
+never blocks the watchdog observer thread. Writers drain their queue into
+micro-batches bounded by row count and age, one transaction per batch: ticks
+with ``COPY ... FROM STDIN``, executions with ``execute_values``.
+
+Ticks and executions each get their own queue, writer thread and connection,
+and the execution writer never waits to fill a batch, so fills are written as
+soon as they are read no matter how far behind the tick lane is.
+"""
+import csv
+import io
+import os
+import queue
+import threading
+import time
+
+from psycopg2.extras import execute_values
+
+from db import RECONNECT_ERRORS, RETRY_DELAY
+from metrics import SampledLog, counter, histogram
+from tailer import FileTailer, DEFAULT_READ_ROWS, PUT_TIMEOUT
+
+TICK_COPY_SQL = "COPY {table} (ts, bid, ask, spread) FROM STDIN WITH (FORMAT csv)"
+EXEC_INSERT_SQL = "INSERT INTO executions VALUES %s ON CONFLICT (ticket, kind) DO NOTHING"
+
+DEFAULT_BATCH_ROWS = 5000
+DEFAULT_BATCH_MS = 250
+DEFAULT_QUEUE_CHUNKS = 64     # queue bound, in chunks of up to DEFAULT_READ_ROWS rows
+
+HEADER_FIELDS = ("time", "ticket")
+LAG_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+ROWS_WRITTEN = counter("bridge_ingest_rows_total", "Rows stored by the ingest writers", ["lane"])
+ROWS_FAILED = counter("bridge_ingest_rows_failed_total", "Rows the database rejected", ["lane"])
+DB_WRITE_SECONDS = histogram("bridge_db_write_seconds", "Time to store one ingest batch", ["lane"])
+INGEST_LAG_SECONDS = histogram("bridge_ingest_lag_seconds",
+                               "EA timestamp of a batch's last row to its DB commit", ["lane"], LAG_BUCKETS)
+
+log = SampledLog("bridge.ingest")
+
+
+def tick_row(row):
+    return row if len(row) == 4 else None
+
+
+def exec_row(row):
+    if len(row) == 6:   # pre-v0.4 EA: opening fills only
+        return row + ["open"]
+    return row if len(row) == 7 else None
+
+
+# ------------------------------------------------------------------- DB writes
+def copy_ticks(conn, rows, table="ticks"):
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+    with conn.cursor() as cur:
+        cur.copy_expert(TICK_COPY_SQL.format(table=table), buf)
+
+
+def insert_executions(conn, rows):
+    with conn.cursor() as cur:
+        execute_values(cur, EXEC_INSERT_SQL, rows)
+
+
+def insert_one_by_one(db, rows, write):
+    """Slow path after a failed batch: keep the good rows, report the bad ones."""
+    written = []
+    for row in rows:
+        try:
+            db.run(lambda conn: write(conn, [row]))
+            written.append(row)
+        except Exception as exc:
+            log.warning("db_insert_error", row=row, error=str(exc))
+    return written
+
+
+# ------------------------------------------------------------------- stages
+class BatchWriter:
+    """Drains row chunks from ``source`` into batches of at most ``max_rows``
+    rows, waiting up to ``max_delay`` seconds for a batch to fill.
+
+    ``write(conn, rows)`` writes one batch on a connection checked out of
+    ``db`` for that batch and committed with it. If the database is
+    unreachable the batch is held and retried (the queue behind it fills up and
+    pauses the tailer); any other error retries the rows one at a time.
+    ``on_written(rows)`` is called with the rows of each batch once stored,
+    ``on_failed(rows)`` with the rows the database rejected.
+
+    Queue items are ``(rows, mark)``; after a batch is stored, the mark of its
+    last item is passed to ``ack`` (the tailer's checkpoint). ``row_time(row)``
+    gives a row's EA timestamp in epoch seconds, for the ingest lag metric.
+    """
+
+    def __init__(self, source, db, write, name,
+                 max_rows=DEFAULT_BATCH_ROWS, max_delay=DEFAULT_BATCH_MS / 1000, on_written=None, ack=None, row_time=None,
+                 on_failed=None):
+        self.source = source
+        self.db = db
+        self.write = write
+        self.name = name
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.ack = ack
+        self.row_time = row_time
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.batches = 0
+        self.last_write = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"write-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Finish writing everything already queued, then stop."""
+        self._stop.set()
+        self._thread.join()
+
+    def _collect(self, first):
+        rows, mark = list(first[0]), first[1]
+        deadline = time.monotonic() + self.max_delay
+        while len(rows) < self.max_rows:
+            try:
+                remaining = deadline - time.monotonic()
+                chunk, mark = (self.source.get(timeout=remaining) if remaining > 0
+                               else self.source.get_nowait())
+            except queue.Empty:
+                break
+            rows.extend(chunk)
+        return rows, mark
+
+    def flush(self, rows):
+        for i in range(0, len(rows), self.max_rows):
+            batch = rows[i:i + self.max_rows]
+            with DB_WRITE_SECONDS.time(lane=self.name):
+                written = self._write_batch(batch)
+            self.last_write = time.time()
+            self.rows_written += len(written)
+            self.rows_failed += len(batch) - len(written)
+            self.batches += 1
+            ROWS_WRITTEN.inc(len(written), lane=self.name)
+            if len(written) < len(batch):
+                ROWS_FAILED.inc(len(batch) - len(written), lane=self.name)
+            lag = None
+            if self.row_time is not None and written:
+                try:
+                    lag = self.last_write - self.row_time(written[-1])
+                    INGEST_LAG_SECONDS.observe(max(lag, 0), lane=self.name)
+                except ValueError:
+                    pass
+            if self.on_written is not None and written:
+                self.on_written(written)
+            if self.on_failed is not None and len(written) < len(batch):
+                kept = {id(row) for row in written}
+                self.on_failed([row for row in batch if id(row) not in kept])
+            log.info("db_batch", lane=self.name, rows=len(batch), last=batch[-1][0],
+                     lag_s=None if lag is None else round(lag, 3))
+
+    def _write_batch(self, batch):
+        while True:
+            try:
+                self.db.run(lambda conn: self.write(conn, batch))
+                return batch
+            except RECONNECT_ERRORS as exc:
+                if self._stop.is_set():
+                    log.warning("db_unavailable_at_shutdown", lane=self.name, dropped=len(batch), error=str(exc))
+                    return []
+                log.warning("db_unavailable", lane=self.name, error=str(exc))
+                time.sleep(RETRY_DELAY)
+            except Exception as exc:
+                log.warning("db_batch_error", lane=self.name, rows=len(batch), error=str(exc))
+                return insert_one_by_one(self.db, batch, self.write)
+
+    def _run(self):
+        while True:
+            try:
+                first = self.source.get(timeout=PUT_TIMEOUT)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            rows, mark = self._collect(first)
+            self.flush(rows)
+            if self.ack is not None and mark is not None:
+                self.ack(mark)
+
+    def stats(self):
+        return {
+            "queue_depth": self.source.qsize(),
+            "queue_capacity": self.source.maxsize,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "batches": self.batches,
+            "last_write": self.last_write,
+        }
+
+
+class IngestLane:
+    """One tailer -> queue -> writer pipeline for a single CSV file."""
+
+    def __init__(self, path, parse, db, write, name, queue_chunks=DEFAULT_QUEUE_CHUNKS,
+                 max_rows=DEFAULT_BATCH_ROWS, max_delay=DEFAULT_BATCH_MS / 1000, on_written=None,
+                 on_read=None, checkpoint=None, row_time=None, on_failed=None):
+        self.name = name
+        self.queue = queue.Queue(maxsize=queue_chunks)
+        self.tailer = FileTailer(path, self.queue, parse, name,
+                                 chunk_rows=min(DEFAULT_READ_ROWS, max_rows), on_read=on_read,
+                                 checkpoint=checkpoint, header_fields=HEADER_FIELDS)
+        self.writer = BatchWriter(self.queue, db, write, name, max_rows, max_delay, on_written,
+                                  ack=self.tailer.ack, row_time=row_time, on_failed=on_failed)
+
+    @property
+    def filename(self):
+        return os.path.basename(self.tailer.path)
+
+    def start(self):
+        self.writer.start()
+        self.tailer.start()
+        return self
+
+    def stop(self):
+        self.tailer.stop()
+        self.writer.stop()
+
+    def stats(self):
+        return {**self.tailer.stats(), **self.writer.stats()}
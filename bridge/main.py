@@ -1,134 +1,381 @@
 """
 EdgeFlow Trader Bridge  v0.2
-• Ingests ticks.csv into TimescaleDB
-• POST /order with risk guard → orders.json  (adds slippage from YAML)
-• Watches executions.csv → inserts fills into DB
+• Ingests ticks.csv into TimescaleDB  (micro-batched COPY, hypertable + M1 aggregate)
+• POST /order, /orders with risk guard → orders/<seq>.json spool  (adds slippage from YAML)
+• Watches executions.csv → inserts fills into DB  (own lane, ahead of ticks)
+• GET /ingest → queue depth, lag and drop counters per lane
+• GET /positions → open positions / exposure from the in-memory position book
+• GET /bars, /signal → live M1/M5/H1 bars built from ticks, MA sell-setup state
+• GET /metrics → Prometheus text: ingest rate / lag, DB write, /order and order-to-fill latency
+• GET /health → "warming" until the DB is reachable and the risk state is loaded, then "ready"
+
+Importing this module has no side effects; run it with
+
+    uvicorn main:create_app --factory        # or: python main.py
+
+``create_app`` only builds the app. Config is read in the lifespan, and
+everything that needs the database (schema bootstrap, risk state, ingest
+lanes) is started by a background thread that retries with backoff, so the
+HTTP port is up immediately and /order answers 503 until the bridge is warm.
+BRIDGE_CONFIG overrides the path of main.toml.
 """
 
-import csv, json, pathlib, tomli, psycopg2, yaml
-from fastapi import FastAPI, HTTPException
+import datetime, logging, os, pathlib, threading, time, pytz, tomli, yaml
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+import metrics, schema
+from bars import BarAggregator, LiveSignal, DEFAULT_CAPACITY, tick_seconds
+from db import Database, DEFAULT_DSN, BACKOFF_INITIAL, BACKOFF_MAX, connection_lost
+from ingest import (IngestLane, copy_ticks, insert_executions, tick_row, exec_row,
+                    DEFAULT_BATCH_ROWS, DEFAULT_BATCH_MS, DEFAULT_QUEUE_CHUNKS)
+from positions import PositionBook
+from spool import FillMatcher, OrderSpool, DEFAULT_DEDUP_WINDOW
+
 # ------------------------------------------------------------------- config
-CONFIG = tomli.load(open(pathlib.Path(__file__).with_suffix(".toml"), "rb"))
-FILES_DIR = pathlib.Path(CONFIG["mt4"]["files_path"])
-TICK_CSV  = FILES_DIR / "ticks.csv"
-ORDER_JSON= FILES_DIR / "orders.json"
-EXEC_CSV  = FILES_DIR / "executions.csv"
-
-RISK = yaml.safe_load(open(pathlib.Path(__file__).parent.parent / "docs" / "risk-config.yaml"))
-
-SLIPPAGE = RISK.get("slippagePoints", 3)
-
-print(">> Bridge watching:", FILES_DIR)
-
-# ------------------------------------------------------------------- DB
-conn = psycopg2.connect(
-    "dbname=edgeflow user=postgres password=postgres host=localhost port=5432"
-)
-cur = conn.cursor()
-cur.execute("""
-CREATE TABLE IF NOT EXISTS ticks(
-  ts TIMESTAMPTZ,
-  bid DOUBLE PRECISION,
-  ask DOUBLE PRECISION,
-  spread DOUBLE PRECISION
-);""")
-cur.execute("""
-CREATE TABLE IF NOT EXISTS executions(
-  ticket  BIGINT PRIMARY KEY,
-  ts      TIMESTAMPTZ,
-  symbol  TEXT,
-  side    TEXT,
-  lot     DOUBLE PRECISION,
-  price   DOUBLE PRECISION
-);""")
-conn.commit()
-
-def insert_tick(row):
-    cur.execute("INSERT INTO ticks VALUES (%s,%s,%s,%s)", row)
-    conn.commit()
-    print("DB tick:", row[0])
-
-def insert_exec(row):
-    cur.execute("""INSERT INTO executions VALUES (%s,%s,%s,%s,%s,%s)
-                   ON CONFLICT (ticket) DO NOTHING""", row)
-    conn.commit()
-    print("DB exec:", row[0])
+BRIDGE_DIR  = pathlib.Path(__file__).parent
+CONFIG_PATH = pathlib.Path(os.environ.get("BRIDGE_CONFIG", BRIDGE_DIR / "main.toml"))
+RISK_PATH   = BRIDGE_DIR.parent / "docs" / "risk-config.yaml"
+
+log = logging.getLogger("bridge")
+
+def load_config(path=CONFIG_PATH):
+    with open(path, "rb") as f:
+        return tomli.load(f)
+
+def load_risk(path=RISK_PATH):
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+# ------------------------------------------------------------------- metrics
+ORDER_SECONDS = metrics.histogram("bridge_order_seconds", "Order request handling time", ["endpoint"])
+ORDER_FILL_SECONDS = metrics.histogram("bridge_order_fill_seconds", "Order spooled to fill read from executions.csv",
+                                       buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300))
 
 # ------------------------------------------------------------------- file watchers
-class TickHandler(FileSystemEventHandler):
-    def __init__(self): self.seek = 0
-    def on_modified(self, event):
-        if not event.src_path.endswith("ticks.csv"): return
-        with open(TICK_CSV) as f:
-            f.seek(self.seek)
-            rdr = csv.reader(f)
-            for r in rdr:
-                if len(r)!=4 or r[0]=="time": continue
-                insert_tick(r)
-            self.seek = f.tell()
-
-class ExecHandler(FileSystemEventHandler):
-    def __init__(self): self.seek = 0
+class WakeHandler(FileSystemEventHandler):
+    """Only nudges the tailers; all reading and writing happens off this thread."""
+    def __init__(self, lanes):
+        self.lanes = lanes
     def on_modified(self, event):
-        if not event.src_path.endswith("executions.csv"): return
-        with open(EXEC_CSV) as f:
-            f.seek(self.seek)
-            rdr = csv.reader(f)
-            for r in rdr:
-                if len(r)!=6 or r[0]=="ticket": continue
-                insert_exec(r)
-            self.seek = f.tell()
-
-def start_watchers():
-    obs = Observer()
-    obs.schedule(TickHandler(), str(FILES_DIR), recursive=False)
-    obs.schedule(ExecHandler(), str(FILES_DIR), recursive=False)
-    obs.start()
+        for lane in self.lanes:
+            if event.src_path.endswith(lane.filename):
+                lane.tailer.wake()
+    on_created = on_modified
+    def on_moved(self, event):
+        for lane in self.lanes:  # rotation: let every tailer re-check its file identity
+            lane.tailer.wake()
 
 
-# ------------------------------------------------------------------- FastAPI
-app = FastAPI(title="EdgeFlow Bridge v0.2")
+# ------------------------------------------------------------------- bridge state
+class Bridge:
+    """Everything the routes use. Construction is cheap and never touches the DB;
+    ``start`` warms the rest in a background thread."""
+
+    def __init__(self, config, risk):
+        self.config = config
+        files_dir = pathlib.Path(config["mt4"]["files_path"])
+        db, ingest, bars_cfg = config.get("db", {}), config.get("ingest", {}), config.get("bars", {})
+        metrics_cfg = config.get("metrics", {})
+        self.files_dir = files_dir
+        self.symbol = config["mt4"].get("symbol", "USDJPY")   # ticks.csv has no symbol column
+        self.order_dir = files_dir / "orders"
+        self.spool_cfg = config.get("spool", {})
+        self.slippage = risk.get("slippagePoints", 3)
+        self.backoff = (db.get("retry_initial", BACKOFF_INITIAL), db.get("retry_max", BACKOFF_MAX))
+        state_dir = BRIDGE_DIR / ingest.get("checkpoint_dir", "state")
+        tick_tz = pytz.timezone(bars_cfg.get("tick_tz", "UTC"))
+
+        # ingest writers and API handlers draw from separate pools, so an /order
+        # request never waits for a connection that is busy with a tick batch
+        self.dsn = db.get("dsn", DEFAULT_DSN)
+        self.ingest_db = Database(self.dsn, db.get("ingest_pool_min", 1), db.get("ingest_pool_max", 4), "ingest")
+        self.api_db    = Database(self.dsn, db.get("api_pool_min", 1), db.get("api_pool_max", 8), "api")
+
+        # risk state: loaded from the DB by the warm-up thread, then kept current by the ingest lanes
+        self.book = PositionBook(risk)
+
+        # live bars + signal, fed straight from the tick tailer (no DB round trip)
+        self.signal = LiveSignal(
+            bars_cfg.get("ma_period", 10),
+            datetime.time.fromisoformat(bars_cfg.get("session_start", "07:30")),
+            datetime.time.fromisoformat(bars_cfg.get("session_end", "11:00")),
+            pytz.timezone(bars_cfg.get("session_tz", "US/Eastern")),
+        )
+        self.bars = BarAggregator(bars_cfg.get("timeframes", ["M1", "M5", "H1"]),
+                                  bars_cfg.get("capacity", DEFAULT_CAPACITY), self.signal, tick_tz)
+
+        # spooled orders waiting for their fill, for the order-to-fill latency histogram
+        self.fills = FillMatcher(metrics_cfg.get("fill_max_age", 300))
+        self.spool = None
+        self._order_lock = threading.Lock()
+
+        # each lane checks out its own connection per batch, so fills never wait behind a COPY
+        self.tick_lane = IngestLane(
+            files_dir / "ticks.csv", tick_row, self.ingest_db, copy_ticks, "ticks",
+            queue_chunks=ingest.get("queue_chunks", DEFAULT_QUEUE_CHUNKS),
+            max_rows=ingest.get("batch_rows", DEFAULT_BATCH_ROWS),
+            max_delay=ingest.get("batch_ms", DEFAULT_BATCH_MS) / 1000,
+            on_written=self.mark_ticks,
+            on_read=self.bars.add_ticks,
+            checkpoint=state_dir / "ticks.offset.json",
+            row_time=lambda row: tick_seconds(row[0], tick_tz),
+        )
+        self.exec_lane = IngestLane(
+            files_dir / "executions.csv", exec_row, self.ingest_db, insert_executions, "executions",
+            queue_chunks=ingest.get("queue_chunks", DEFAULT_QUEUE_CHUNKS),
+            max_delay=0,  # write fills as soon as they are read
+            on_written=self.book_fills,
+            on_read=self.record_fills,
+            on_failed=self.fills.dropped,
+            checkpoint=state_dir / "executions.offset.json",
+            row_time=lambda row: tick_seconds(row[1], tick_tz),
+        )
+        self.lanes = (self.exec_lane, self.tick_lane)
+
+        self.status = "starting"      # -> warming -> ready (or failed)
+        self.error = None
+        self.started_at = time.monotonic()
+        self.warm_seconds = None
+        self._observer = None
+        self._lanes_started = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._warm, name="bridge-warm", daemon=True)
+
+        lanes = self.lanes
+        metrics.gauge("bridge_queue_depth", "Chunks queued between tailer and writer", ["lane"],
+                      fn=lambda: {(lane.name,): lane.queue.qsize() for lane in lanes})
+        metrics.gauge("bridge_tail_lag_bytes", "Bytes appended to the CSV but not read yet", ["lane"],
+                      fn=lambda: {(lane.name,): lane.tailer.lag_bytes for lane in lanes})
+        metrics.gauge("bridge_tailer_stalls", "Times a tailer waited on a full queue", ["lane"],
+                      fn=lambda: {(lane.name,): lane.tailer.stalls for lane in lanes})
+        metrics.gauge("bridge_spool_pending", "Spooled orders the EA has not picked up",
+                      fn=lambda: {(): self.spool.pending() if self.spool else None})
+        metrics.gauge("bridge_fills_awaited", "Spooled orders not matched to a fill yet",
+                      fn=lambda: {(): len(self.fills.pending)})
+        metrics.gauge("bridge_ready", "1 once the DB is reachable and the risk state is loaded",
+                      fn=lambda: {(): int(self.ready)})
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    # ------------------------------------------------------------------- lifecycle
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _warm(self):
+        """DB, schema, risk state, then the ingest lanes; retried with backoff while the DB is down."""
+        self.status = "warming"
+        initial, max_delay = self.backoff
+        delay = initial
+        while not self._stop.is_set():
+            try:
+                if not self.api_db.wait_ready(self._stop, initial, max_delay):
+                    return
+                schema.bootstrap(self.dsn, self.config.get("timescale"))  # hypertables, compression, M1 aggregate
+                self.book.load(self.api_db)
+                break
+            except Exception as exc:
+                if not connection_lost(exc):   # schema.bootstrap connects on its own
+                    self.status, self.error = "failed", str(exc)
+                    log.exception("warm-up failed")
+                    return
+                log.warning("warm-up interrupted (%s), retrying in %.1fs", exc, delay)
+                self._stop.wait(delay)
+                delay = min(delay * 2, max_delay)
+        if self._stop.is_set():
+            return
+
+        self.spool = OrderSpool(self.order_dir, self.spool_cfg.get("dedup_window", DEFAULT_DEDUP_WINDOW),
+                                self.spool_cfg.get("fsync", True))
+        # lanes start only after the book holds the stored fills, so each close row finds its open
+        for lane in self.lanes:
+            lane.start()
+        self._lanes_started = True
+        try:
+            self._observer = Observer()
+            self._observer.schedule(WakeHandler(self.lanes), str(self.files_dir), recursive=False)
+            self._observer.start()
+        except OSError as exc:  # tailers still poll every POLL_SECONDS
+            self._observer = None
+            log.warning("cannot watch %s (%s), polling only", self.files_dir, exc)
+        self.warm_seconds = time.monotonic() - self.started_at
+        self.status = "ready"
+        log.info("ready in %.2fs, watching %s", self.warm_seconds, self.files_dir)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._lanes_started:
+            for lane in self.lanes:
+                lane.stop()
+        if self.spool is not None:
+            self.spool.close()
+        self.ingest_db.close()
+        self.api_db.close()
+
+    def health(self):
+        return {"status": self.status, "error": self.error, "warm_seconds": self.warm_seconds,
+                "db_reconnects": self.api_db.reconnects + self.ingest_db.reconnects}
+
+    # ------------------------------------------------------------------- orders
+    def mark_ticks(self, rows):
+        self.book.mark(rows, self.symbol)
 
+    def book_fills(self, rows):
+        self.book.apply(rows)
+        self.fills.booked(rows)   # counted by the book from here on
+
+    def record_fills(self, rows):
+        for latency in self.fills.filled(rows, time.time()):
+            ORDER_FILL_SECONDS.observe(latency)
+
+    def risk_check(self, o: dict, in_flight=()):
+        # lot step, lot ladder, open trade and lot caps, daily loss cap, per-trade risk
+        self.book.check(o, in_flight)
+
+    def prepare(self, order, in_flight=()):
+        o = order.dict()
+        o["slippage"] = self.slippage
+        self.risk_check(o, in_flight)
+        return o
+
+    def submit(self, orders):
+        """Risk-check and spool ``orders`` in order; one result dict per order.
+
+        Repeated ``client_order_id`` values are answered as duplicates before the
+        risk check. Orders spooled but not filled yet, and those accepted earlier
+        in the batch, count against the caps; the lock keeps concurrent requests
+        from both passing on the same headroom.
+        """
+        results, accepted, batch_ids = [None] * len(orders), [], set()
+        with self._order_lock:
+            in_flight = self.fills.in_flight(time.time())
+            for i, order in enumerate(orders):
+                client_id = order.client_order_id
+                seq = self.spool.spooled_as(client_id)
+                if seq is not None:
+                    results[i] = {"status": "duplicate", "seq": seq}
+                    continue
+                if client_id in batch_ids:     # submit_many answers with the first one's seq
+                    accepted.append((i, order.dict()))
+                    continue
+                try:
+                    o = self.prepare(order, in_flight)
+                except ValueError as exc:
+                    results[i] = {"status": "rejected", "error": str(exc)}
+                    continue
+                accepted.append((i, o))
+                in_flight.append(o["lot"])
+                if client_id:
+                    batch_ids.add(client_id)
+            spooled = self.spool.submit_many([o for _, o in accepted])
+            now = time.time()
+            for (i, o), (seq, duplicate) in zip(accepted, spooled):
+                results[i] = {"status": "duplicate" if duplicate else "queued", "seq": seq}
+                if not duplicate:
+                    self.fills.spooled(seq, o, now)
+        return results
+
+    def require_ready(self):
+        if not self.ready:
+            raise HTTPException(503, f"bridge {self.status}: risk state not loaded yet",
+                                headers={"Retry-After": "1"})
+
+
+# ------------------------------------------------------------------- FastAPI
 class Order(BaseModel):
     symbol: str
     side  : str
     lot   : float
     sl    : float | None = None
     tp    : float | None = None
+    client_order_id: str | None = None   # repeats are not spooled twice
 
-def risk_check(o: dict):
-    # lot increment check (0.01 multiple)
-    if round(o["lot"] * 100) % 1 != 0:
-        raise ValueError("lot must be multiple of 0.01")
+def create_app(config=None, risk=None):
+    """Build the app; config and risk are read (from BRIDGE_CONFIG / RISK_PATH if not given) at startup."""
 
-    # open trade cap (counting executions as positions)
-    cur.execute("SELECT COUNT(*) FROM executions")
-    if cur.fetchone()[0] >= RISK["maxOpenTrades"]:
-        raise ValueError("maxOpenTrades exceeded")
+    @asynccontextmanager
+    async def lifespan(app):
+        cfg = config or load_config()
+        logging.basicConfig(level=cfg.get("metrics", {}).get("log_level", "INFO"),
+                            format="%(asctime)s %(name)s %(message)s")
+        bridge = Bridge(cfg, risk or load_risk())
+        app.state.bridge = bridge.start()
+        try:
+            yield
+        finally:
+            bridge.stop()
 
-@app.post("/order")
-async def post_order(order: Order):
-    try:
-        o = order.dict()
-        o["slippage"] = SLIPPAGE
-        risk_check(o)
-        ORDER_JSON.write_text(json.dumps(o))
-        return {"status":"queued"}
-    except Exception as exc:
-        raise HTTPException(400, str(exc))
-
-# ------------------------------------------------------------------- bootstrap
-@app.on_event("startup")
-def _startup():
-    start_watchers()
+    app = FastAPI(title="EdgeFlow Bridge v0.2", lifespan=lifespan)
 
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000)
+    def state(request: Request) -> Bridge:
+        return request.app.state.bridge
+
+    @app.post("/order")
+    def post_order(order: Order, request: Request):
+        bridge = state(request)
+        with ORDER_SECONDS.time(endpoint="order"):
+            bridge.require_ready()
+            try:
+                result = bridge.submit([order])[0]
+            except Exception as exc:
+                raise HTTPException(400, str(exc))
+            if result["status"] == "rejected":
+                raise HTTPException(400, result["error"])
+            return result
+
+    @app.post("/orders")
+    def post_orders(orders: list[Order], request: Request):
+        """Spool a batch in order; orders failing the risk guard are rejected individually."""
+        bridge = state(request)
+        with ORDER_SECONDS.time(endpoint="orders"):
+            bridge.require_ready()
+            try:
+                return {"results": bridge.submit(orders)}
+            except Exception as exc:
+                raise HTTPException(400, str(exc))
+
+    @app.get("/positions")
+    def positions(request: Request):
+        bridge = state(request)
+        bridge.require_ready()
+        return bridge.book.snapshot()
+
+    @app.get("/bars")
+    def get_bars(request: Request, tf: str = "M1", n: int = 500):
+        bars = state(request).bars
+        if tf not in bars.builders:
+            raise HTTPException(404, f"timeframe {tf} not built (have {sorted(bars.builders)})")
+        return bars.bars(tf, n)
+
+    @app.get("/signal")
+    def get_signal(request: Request):
+        return state(request).signal.last or {}
 
-    print(app.routes)
+    @app.get("/ingest")
+    def ingest_stats(request: Request):
+        return {lane.name: lane.stats() for lane in state(request).lanes}
 
+    @app.get("/metrics")
+    def get_metrics():
+        return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+    @app.get("/health")
+    def health(request: Request):
+        return state(request).health()
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("main:create_app", factory=True, host="0.0.0.0", port=8000)
@@ -0,0 +1,192 @@
+"""
+Minimal Prometheus metrics and sampled structured logging for the bridge.
+
+    ROWS = counter("bridge_ingest_rows_total", "Rows stored", ["lane"])
+    ROWS.inc(len(rows), lane="ticks")
+    LATENCY = histogram("bridge_db_write_seconds", "DB batch write time", ["lane"])
+    with LATENCY.time(lane="ticks"): ...
+    gauge("bridge_queue_depth", "Queued chunks", ["lane"], fn=lambda: {("ticks",): 3})
+
+``render()`` returns every registered metric in the Prometheus text format
+(served by ``GET /metrics``). Hot paths log through ``SampledLog``, which
+writes one JSON line per event name per interval with a count of the
+occurrences it folded in, instead of one print per row or batch.
+"""
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LOG_INTERVAL = 5.0
+
+_METRICS = []
+_lock = threading.Lock()
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, doc, labels=()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.doc}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with _lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.labels, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set explicitly, or computed at scrape time by ``fn() -> {label_values: value}``."""
+    kind = "gauge"
+
+    def __init__(self, name, doc, labels=(), fn=None):
+        super().__init__(name, doc, labels)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+    def render(self):
+        if self.fn is not None:
+            items = sorted((tuple(map(str, k)), v) for k, v in self.fn().items())
+        else:
+            with _lock:
+                items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_label_text(self.labels, k)} {_number(v)}"
+                                for k, v in items if v is not None]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, doc, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += 1
+            state[2] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self):
+        with _lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = self.header()
+        for key, (counts, total, value_sum) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, key, [('le', '+Inf')])} {total}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {_number(value_sum)}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {total}")
+        return lines
+
+
+def _register(metric):
+    """Add ``metric``, replacing one of the same name (e.g. from an earlier app)."""
+    with _lock:
+        _METRICS[:] = [m for m in _METRICS if m.name != metric.name]
+        _METRICS.append(metric)
+    return metric
+
+
+def counter(name, doc, labels=()):
+    return _register(Counter(name, doc, labels))
+
+
+def gauge(name, doc, labels=(), fn=None):
+    return _register(Gauge(name, doc, labels, fn))
+
+
+def histogram(name, doc, labels=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, doc, labels, buckets))
+
+
+def render():
+    lines = []
+    with _lock:
+        registered = list(_METRICS)
+    for metric in registered:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class SampledLog:
+    """JSON-lines logger that emits each event name at most once per ``interval``."""
+
+    def __init__(self, name, interval=LOG_INTERVAL):
+        self.logger = logging.getLogger(name)
+        self.interval = interval
+        self._last = {}         # event -> (emitted_at, folded)
+        self._lock = threading.Lock()
+
+    def log(self, level, event, **fields):
+        now = time.monotonic()
+        with self._lock:
+            emitted_at, folded = self._last.get(event, (None, 0))
+            if emitted_at is not None and now - emitted_at < self.interval:
+                self._last[event] = (emitted_at, folded + 1)
+                return
+            self._last[event] = (now, 0)
+        if folded:
+            fields["suppressed"] = folded
+        self.logger.log(level, json.dumps({"event": event, **fields}, default=str))
+
+    def info(self, event, **fields):
+        self.log(logging.INFO, event, **fields)
+
+    def warning(self, event, **fields):
+        self.log(logging.WARNING, event, **fields)
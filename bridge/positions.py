@@ -0,0 +1,212 @@
+"""
+In-memory position book for the bridge's risk guard.
+
+MT4 hedges: every order opens its own ticket, and the EA writes an ``open`` row
+to executions.csv when it fills and a close row (tp / sl / so / close) when the
+ticket leaves the terminal's book. Positions are therefore keyed by ticket: an
+open row adds one, its close row removes it and books its PnL. The book is
+loaded once from the executions table (in the background at startup; until
+then ``ready`` is False) and then fed by the execution ingest lane, so every
+rule in ``check`` is answered from running totals without touching the
+database.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+PIP_SIZE = 0.01              # USDJPY
+PIP_VALUE_PER_LOT = 10.0     # USD per pip per 1.00 lot
+LOT_STEP = 0.01
+EPSILON = 1e-9
+CLOSED_TICKETS = 10000       # closed tickets remembered to drop replayed rows
+
+# a ticket's open row sorts before its close row even when both share a second
+LOAD_SQL = ("SELECT ticket, ts, symbol, side, lot, price, kind FROM executions "
+            "ORDER BY ts, kind <> 'open', ticket")
+
+
+def _day(ts):
+    return str(ts)[:10]
+
+
+def _pnl(direction, entry, exit_price, lot):
+    return (exit_price - entry) * direction / PIP_SIZE * PIP_VALUE_PER_LOT * lot
+
+
+class PositionBook:
+    def __init__(self, risk):
+        lot_rule = risk.get("lotIncrease", {})
+        self.starting_balance = float(risk.get("startingBalance", 0))
+        self.starting_lots = float(risk.get("startingLots", LOT_STEP))
+        self.trigger_step = float(lot_rule.get("triggerBalanceStep", 0))
+        self.lots_per_step = float(lot_rule.get("lotsPerStep", 0))
+        self.hard_max_lots = float(lot_rule.get("hardMaxLots", math.inf))
+        self.max_open_trades = int(risk.get("maxOpenTrades", 0))
+        self.max_risk_pct = float(risk.get("maxRiskPerTradePct", 0))
+        self.daily_loss_cap_pct = float(risk.get("dailyLossCapPct", 0))
+
+        self.positions = {}         # ticket -> [symbol, direction, lot, price]
+        self.net_lots = {}          # symbol -> signed open lots
+        self.net_cost = {}          # symbol -> sum of signed lot * entry price
+        self.realized = 0.0
+        self.day = None
+        self.day_realized = 0.0
+        self.quotes = {}            # symbol -> (bid, ask), last tick seen
+        self.closed = OrderedDict()  # recently closed tickets, oldest first
+        self.ready = False          # history loaded from the DB
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls, db, risk):
+        book = cls(risk)
+        book.load(db)
+        return book
+
+    def load(self, db):
+        """Apply every stored fill; call before the execution lane starts."""
+        with db.cursor() as cur:
+            cur.execute(LOAD_SQL)
+            self.apply(cur.fetchall())
+        self.ready = True
+
+    # ------------------------------------------------------------------- updates
+    def apply(self, rows):
+        """Apply rows ``(ticket, time, symbol, side, lot, price[, kind])``; repeats are ignored.
+
+        ``kind`` is ``open`` (the default) or how the ticket was closed.
+        """
+        with self._lock:
+            for ticket, ts, symbol, side, lot, price, *kind in rows:
+                ticket = int(ticket)
+                if ticket in self.closed:
+                    continue
+                self._roll_day(ts)
+                if not kind or kind[0] == "open":
+                    self._open(ticket, symbol, 1 if side.lower().startswith("buy") else -1,
+                               float(lot), float(price))
+                else:
+                    self._close(ticket, float(lot), float(price))
+
+    def mark(self, rows, symbol):
+        """Record the latest ``symbol`` quote from tick rows ``(time, bid, ask, spread)``."""
+        if not rows:
+            return
+        ts, bid, ask = rows[-1][:3]
+        with self._lock:
+            self._roll_day(ts)
+            self.quotes[symbol] = (float(bid), float(ask))
+
+    def _roll_day(self, ts):
+        day = _day(ts)
+        if self.day is None or day > self.day:
+            self.day, self.day_realized = day, 0.0
+
+    def _open(self, ticket, symbol, direction, lot, price):
+        if ticket in self.positions:
+            return
+        self.positions[ticket] = [symbol, direction, lot, price]
+        self._add_net(symbol, direction, lot, price)
+
+    def _close(self, ticket, lot, price):
+        self.closed[ticket] = None
+        if len(self.closed) > CLOSED_TICKETS:
+            self.closed.popitem(last=False)
+        position = self.positions.pop(ticket, None)
+        if position is None:    # opened before the stored history began
+            return
+        symbol, direction, open_lot, entry = position
+        # a partial close books only the closed lots; MT4 moves the rest to a new ticket
+        pnl = _pnl(direction, entry, price, min(lot, open_lot))
+        self.realized += pnl
+        self.day_realized += pnl
+        self._add_net(symbol, direction, -open_lot, entry)
+
+    def _add_net(self, symbol, direction, lot, price):
+        self.net_lots[symbol] = self.net_lots.get(symbol, 0.0) + direction * lot
+        self.net_cost[symbol] = self.net_cost.get(symbol, 0.0) + direction * lot * price
+
+    # ------------------------------------------------------------------- queries
+    @property
+    def open_count(self):
+        return len(self.positions)
+
+    @property
+    def balance(self):
+        return self.starting_balance + self.realized
+
+    def exposure(self, symbol):
+        """Signed open lots in ``symbol`` (positive = long)."""
+        return self.net_lots.get(symbol, 0.0)
+
+    def _open_symbols(self):
+        return [s for s, lots in self.net_lots.items() if abs(lots) > EPSILON]
+
+    def unpriced(self):
+        """Symbols with open lots but no quote yet; left out of ``floating_pnl``."""
+        return sorted(s for s in self._open_symbols() if s not in self.quotes)
+
+    def floating_pnl(self):
+        total = 0.0
+        for s in self._open_symbols():
+            if s in self.quotes:
+                mid = sum(self.quotes[s]) / 2
+                total += (self.net_lots[s] * mid - self.net_cost[s]) / PIP_SIZE * PIP_VALUE_PER_LOT
+        return total
+
+    @property
+    def equity(self):
+        return self.balance + self.floating_pnl()
+
+    def max_lots(self):
+        """Lot ceiling from the ``lotIncrease`` ladder at the current balance."""
+        steps = 0
+        if self.trigger_step > 0:
+            steps = max(math.floor((self.balance - self.starting_balance) / self.trigger_step), 0)
+        return min(self.starting_lots + steps * self.lots_per_step, self.hard_max_lots)
+
+    def open_lots(self):
+        return sum(position[2] for position in self.positions.values())
+
+    def check(self, order, in_flight=()):
+        """Raise ValueError if ``order`` (symbol, side, lot, sl) breaks a risk rule.
+
+        ``in_flight`` holds the lots of orders already accepted but not filled
+        yet; they count as open tickets.
+        """
+        lot = order["lot"]
+        direction = 1 if order["side"].lower().startswith("buy") else -1
+        with self._lock:
+            if abs(lot / LOT_STEP - round(lot / LOT_STEP)) > EPSILON:
+                raise ValueError("lot must be multiple of 0.01")
+            if lot > self.max_lots() + EPSILON:
+                raise ValueError(f"lot exceeds {self.max_lots():.2f} allowed at this balance")
+
+            if self.open_count + len(in_flight) >= self.max_open_trades:   # every order opens its own ticket
+                raise ValueError("maxOpenTrades exceeded")
+            if self.open_lots() + sum(in_flight) + lot > self.hard_max_lots + EPSILON:
+                raise ValueError(f"open and queued lots would exceed hardMaxLots {self.hard_max_lots:g}")
+
+            if self.daily_loss_cap_pct > 0:
+                day_start = self.balance - self.day_realized
+                if -self.day_realized >= day_start * self.daily_loss_cap_pct / 100:
+                    raise ValueError("dailyLossCapPct reached")
+
+            quote = self.quotes.get(order["symbol"])
+            if self.max_risk_pct > 0 and order.get("sl") is not None and quote is not None:
+                entry = quote[1] if direction > 0 else quote[0]
+                risk = abs(entry - order["sl"]) / PIP_SIZE * PIP_VALUE_PER_LOT * lot
+                if risk > self.equity * self.max_risk_pct / 100:
+                    raise ValueError("maxRiskPerTradePct exceeded")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "open_trades": self.open_count,
+                "exposure": {s: round(v, 2) for s, v in self.net_lots.items() if abs(v) > EPSILON},
+                "balance": round(self.balance, 2),
+                "equity": round(self.equity, 2),
+                "unpriced": self.unpriced(),
+                "day": self.day,
+                "day_realized": round(self.day_realized, 2),
+                "max_lots": self.max_lots(),
+            }
@@ -0,0 +1,181 @@
+"""
+Bridge database schema (TimescaleDB).
+
+    ticks        hypertable on ts, 1-day chunks, compressed after N days,
+                 dropped after the retention window
+    candles_m1   continuous aggregate: M1 OHLC of bid, refreshed every minute
+    executions   plain table + ts index (see below); inserts NOTIFY 'executions'
+
+``executions`` holds one ``open`` row per ticket and, once the order is
+closed, one row with the close type (tp / sl / so / close), hence the
+``(ticket, kind)`` primary key. It stays a regular table: hypertable unique
+indexes must include the time column, which would break
+``ON CONFLICT (ticket, kind)``. It grows by a few rows a day, so partitioning
+it buys nothing. Tables created before close rows existed are migrated in
+place (kind defaults to 'open').
+
+Without the timescaledb extension the same tables are created as plain
+Postgres tables with a ts index, and the candle view is skipped.
+
+    docker compose -f docker/timescaledb-compose.yml up -d
+    cd bridge && python schema.py        # bootstrap and print the layout
+"""
+import pathlib
+
+import psycopg2
+import tomli
+
+from db import DEFAULT_DSN
+
+DEFAULT_SETTINGS = {
+    "chunk_interval": "1 day",
+    "compress_after_days": 7,      # 0 = no compression policy
+    "retention_days": 365,         # raw ticks; 0 = keep forever
+    "candle_retention_days": 0,    # candles_m1; 0 = keep forever
+}
+
+TABLES_SQL = [
+    """
+CREATE TABLE IF NOT EXISTS ticks(
+  ts TIMESTAMPTZ NOT NULL,
+  bid DOUBLE PRECISION,
+  ask DOUBLE PRECISION,
+  spread DOUBLE PRECISION
+);""",
+    """
+CREATE TABLE IF NOT EXISTS executions(
+  ticket  BIGINT,
+  ts      TIMESTAMPTZ,
+  symbol  TEXT,
+  side    TEXT,
+  lot     DOUBLE PRECISION,
+  price   DOUBLE PRECISION,
+  kind    TEXT NOT NULL DEFAULT 'open',
+  PRIMARY KEY (ticket, kind)
+);""",
+    "ALTER TABLE executions ADD COLUMN IF NOT EXISTS kind TEXT NOT NULL DEFAULT 'open'",
+    """
+DO $$ BEGIN
+  IF EXISTS (SELECT 1 FROM pg_index WHERE indrelid = 'executions'::regclass
+             AND indisprimary AND indnatts = 1) THEN
+    ALTER TABLE executions DROP CONSTRAINT executions_pkey, ADD PRIMARY KEY (ticket, kind);
+  END IF;
+END $$""",
+    "CREATE INDEX IF NOT EXISTS executions_ts_idx ON executions (ts DESC)",
+    # every new fill is announced on the 'executions' channel (webapp live feed);
+    # rows skipped by ON CONFLICT DO NOTHING fire no AFTER INSERT trigger
+    """
+CREATE OR REPLACE FUNCTION notify_execution() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('executions', json_build_object(
+    'ticket', NEW.ticket, 'time', to_char(NEW.ts, 'YYYY-MM-DD HH24:MI:SS'),
+    'symbol', NEW.symbol, 'side', NEW.side, 'lot', NEW.lot, 'price', NEW.price,
+    'kind', NEW.kind)::text);
+  RETURN NEW;
+END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS executions_notify ON executions",
+    "CREATE TRIGGER executions_notify AFTER INSERT ON executions "
+    "FOR EACH ROW EXECUTE FUNCTION notify_execution()",
+]
+
+CANDLES_M1_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS candles_m1
+WITH (timescaledb.continuous) AS
+SELECT time_bucket(INTERVAL '1 minute', ts) AS bucket,
+       first(bid, ts) AS open,
+       max(bid)       AS high,
+       min(bid)       AS low,
+       last(bid, ts)  AS close,
+       count(*)       AS ticks
+FROM ticks
+GROUP BY bucket
+WITH NO DATA"""
+
+
+def _days(n):
+    return f"{int(n)} days"
+
+
+def _has_timescale(cur):
+    cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'timescaledb'")
+    if cur.fetchone() is None:
+        return False
+    cur.execute("CREATE EXTENSION IF NOT EXISTS timescaledb")
+    return True
+
+
+def _retention(cur, relation, days):
+    cur.execute("SELECT remove_retention_policy(%s, if_exists => TRUE)", (relation,))
+    if days:
+        cur.execute("SELECT add_retention_policy(%s, %s::interval)", (relation, _days(days)))
+
+
+def _bootstrap_timescale(cur, settings):
+    cur.execute("SELECT create_hypertable('ticks', 'ts', chunk_time_interval => %s::interval, "
+                "if_not_exists => TRUE, migrate_data => TRUE)", (settings["chunk_interval"],))
+    cur.execute("SELECT set_chunk_time_interval('ticks', %s::interval)", (settings["chunk_interval"],))
+
+    # compression settings cannot change while compressed chunks exist, so set them once
+    cur.execute("SELECT compression_enabled FROM timescaledb_information.hypertables "
+                "WHERE hypertable_name = 'ticks'")
+    if not cur.fetchone()[0]:
+        cur.execute("ALTER TABLE ticks SET (timescaledb.compress, "
+                    "timescaledb.compress_orderby = 'ts DESC')")
+    cur.execute("SELECT remove_compression_policy('ticks', if_exists => TRUE)")
+    if settings["compress_after_days"]:
+        cur.execute("SELECT add_compression_policy('ticks', %s::interval)",
+                    (_days(settings["compress_after_days"]),))
+    _retention(cur, "ticks", settings["retention_days"])
+
+    cur.execute(CANDLES_M1_SQL)
+    cur.execute("SELECT add_continuous_aggregate_policy('candles_m1', "
+                "start_offset => INTERVAL '1 day', end_offset => INTERVAL '1 minute', "
+                "schedule_interval => INTERVAL '1 minute', if_not_exists => TRUE)")
+    _retention(cur, "candles_m1", settings["candle_retention_days"])
+
+
+def bootstrap(dsn, settings=None):
+    """Create or update the schema; returns True if TimescaleDB features are on."""
+    settings = {**DEFAULT_SETTINGS, **(settings or {})}
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True  # continuous aggregates cannot be created inside a transaction
+    try:
+        with conn.cursor() as cur:
+            for sql in TABLES_SQL:
+                cur.execute(sql)
+            timescale = _has_timescale(cur)
+            if timescale:
+                _bootstrap_timescale(cur, settings)
+            else:
+                cur.execute("CREATE INDEX IF NOT EXISTS ticks_ts_idx ON ticks (ts DESC)")
+                print("!! timescaledb extension not available - using plain tables")
+        return timescale
+    finally:
+        conn.close()
+
+
+def describe(dsn):
+    conn = psycopg2.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT hypertable_name, num_chunks, compression_enabled "
+                        "FROM timescaledb_information.hypertables")
+            for row in cur.fetchall():
+                print("hypertable:", row)
+            cur.execute("SELECT view_name, materialized_only "
+                        "FROM timescaledb_information.continuous_aggregates")
+            for row in cur.fetchall():
+                print("cagg      :", row)
+            cur.execute("SELECT proc_name, hypertable_name, schedule_interval, config "
+                        "FROM timescaledb_information.jobs WHERE hypertable_name IS NOT NULL")
+            for row in cur.fetchall():
+                print("job       :", row)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    config = tomli.load(open(pathlib.Path(__file__).with_name("main.toml"), "rb"))
+    dsn = config.get("db", {}).get("dsn", DEFAULT_DSN)
+    if bootstrap(dsn, config.get("timescale")):
+        describe(dsn)
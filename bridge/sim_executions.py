@@ -0,0 +1,83 @@
+"""
+Simulated EA fill writer, for exercising the live path end to end without MT4.
+
+    cd bridge && python sim_executions.py [--path FILE] [--rate 2] [--count 0]
+
+Appends ``ticket,time,symbol,side,lot,price,kind`` rows to executions.csv
+(the configured MT4 Files directory by default) at ``rate`` rows/s, writing
+the header first if the file is new, one flushed line at a time like the EA.
+Sides alternate in runs of 1-3; once up to ``MAX_OPEN`` tickets are open, the
+oldest ones get tp / sl close rows as well, so realized P&L moves. Prices
+follow a random walk around 145.000. With the bridge running, each row goes
+
+    executions.csv -> bridge exec lane -> executions table
+        -> NOTIFY executions -> webapp LiveFeed -> /api/stream (SSE)
+"""
+import argparse
+import os
+import random
+import time
+
+HEADER = "ticket,time,symbol,side,lot,price,kind\n"
+SYMBOL = "USDJPY"
+START_PRICE = 145.0
+MAX_OPEN = 4
+
+
+def default_path():
+    from main import load_config
+    return os.path.join(load_config()["mt4"]["files_path"], "executions.csv")
+
+
+def fills(seed=None):
+    rng = random.Random(seed)
+    ticket = int(time.time())
+    price, side, run = START_PRICE, "buy", 0
+    opened = []     # (ticket, side, lot), oldest first
+    while True:
+        price = round(price + rng.gauss(0, 0.05), 3)
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+        if opened and (len(opened) >= MAX_OPEN or rng.random() < 0.4):
+            closed, closed_side, lot = opened.pop(0)
+            yield f"{closed},{stamp},{SYMBOL},{closed_side},{lot},{price},{rng.choice(('tp', 'sl'))}\n"
+            continue
+        if run == 0:
+            side, run = ("sell" if side == "buy" else "buy"), rng.randint(1, 3)
+        run -= 1
+        ticket += 1
+        lot = rng.choice((0.01, 0.02, 0.05))
+        opened.append((ticket, side, lot))
+        yield f"{ticket},{stamp},{SYMBOL},{side},{lot},{price},open\n"
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--path", help="executions.csv to append to (default: from main.toml)")
+    ap.add_argument("--rate", type=float, default=2.0, help="rows per second")
+    ap.add_argument("--count", type=int, default=0, help="stop after this many rows (0 = run until Ctrl-C)")
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+
+    path = args.path or default_path()
+    new = not os.path.exists(path) or os.path.getsize(path) == 0
+    written = 0
+    with open(path, "a", encoding="utf-8", newline="") as f:
+        if new:
+            f.write(HEADER)
+            f.flush()
+        try:
+            for line in fills(args.seed):
+                f.write(line)
+                f.flush()
+                written += 1
+                print(line, end="")
+                if args.count and written >= args.count:
+                    break
+                time.sleep(1 / args.rate)
+        except KeyboardInterrupt:
+            pass
+    print(f"wrote {written} rows to {path}")
+
+
+if __name__ == "__main__":
+    main()
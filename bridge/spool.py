@@ -0,0 +1,215 @@
+"""
+Order spool between the bridge and the EA.
+
+Each accepted order becomes its own file ``orders/<seq>.json`` in the MT4
+Files directory, so orders queued before the EA's next tick are never
+overwritten. Files are written as ``<seq>.json.tmp`` and renamed into place,
+so the EA (which only looks at ``*.json``) never sees a partial file, and are
+written under one lock in sequence order; the EA always takes the lowest
+sequence number first and deletes each file once it has executed it.
+
+``spool.log`` journals ``seq,client_order_id`` for every spooled order. It
+restores the sequence counter after a restart and backs the de-duplication
+of repeated ``client_order_id`` values over the last ``dedup_window`` orders.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict, deque
+
+JOURNAL_NAME = "spool.log"
+DEFAULT_DEDUP_WINDOW = 100_000
+SEQ_WIDTH = 12  # zero padded, so name order == sequence order
+
+
+class OrderSpool:
+    def __init__(self, directory, dedup_window=DEFAULT_DEDUP_WINDOW, fsync=True):
+        self.directory = str(directory)
+        self.dedup_window = dedup_window
+        self.fsync = fsync
+        self.seq = 0
+        self.duplicates = 0
+        self._ids = OrderedDict()     # client_order_id -> seq, oldest first
+        self._journal_lines = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._journal_path = os.path.join(self.directory, JOURNAL_NAME)
+        self._recover()
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def _recover(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.tmp"):
+                os.remove(os.path.join(self.directory, name))  # never renamed, never acknowledged
+            elif name.endswith(".json") and name[:-5].isdigit():
+                self.seq = max(self.seq, int(name[:-5]))
+        if os.path.exists(self._journal_path):
+            with open(self._journal_path, encoding="utf-8") as f:
+                for line in f:
+                    seq, _, client_id = line.rstrip("\n").partition(",")
+                    if not seq.isdigit():
+                        continue  # torn last line
+                    self.seq = max(self.seq, int(seq))
+                    self._remember(client_id, int(seq))
+                    self._journal_lines += 1
+
+    def _remember(self, client_id, seq):
+        if not client_id:
+            return
+        self._ids[client_id] = seq
+        self._ids.move_to_end(client_id)
+        while len(self._ids) > self.dedup_window:
+            self._ids.popitem(last=False)
+
+    def path_for(self, seq):
+        return os.path.join(self.directory, f"{seq:0{SEQ_WIDTH}d}.json")
+
+    def _write(self, seq, order):
+        path = self.path_for(seq)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(json.dumps(order))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def submit_many(self, orders):
+        """Spool ``orders`` in order; returns ``(seq, duplicate)`` per order.
+
+        An order whose ``client_order_id`` was already spooled is not written
+        again and reports the original sequence number. The batch is journaled
+        (and fsynced) before any order file is published, so after a crash the
+        EA can never have executed a seq the journal does not know.
+        """
+        for order in orders:
+            if any(c in (order.get("client_order_id") or "") for c in "\r\n"):
+                raise ValueError("client_order_id must be a single line")
+        results, batch = [], []
+        with self._lock:
+            for order in orders:
+                client_id = order.get("client_order_id") or ""
+                if client_id in self._ids:
+                    self.duplicates += 1
+                    results.append((self._ids[client_id], True))
+                    continue
+                self.seq += 1
+                batch.append((self.seq, {**order, "seq": self.seq}))
+                self._journal.write(f"{self.seq},{client_id}\n")
+                self._journal_lines += 1
+                self._remember(client_id, self.seq)
+                results.append((self.seq, False))
+            self._journal.flush()
+            if self.fsync:
+                os.fsync(self._journal.fileno())
+            for i, (seq, order) in enumerate(batch):
+                try:
+                    self._write(seq, order)
+                except OSError:     # not published: let a retry spool them again
+                    for _, unsent in batch[i:]:
+                        self._ids.pop(unsent.get("client_order_id") or "", None)
+                    raise
+            if self._journal_lines > 2 * self.dedup_window:
+                self._compact()
+        return results
+
+    def submit(self, order):
+        return self.submit_many([order])[0]
+
+    def spooled_as(self, client_id):
+        """Sequence number ``client_id`` was already spooled under, or None (counted as a duplicate)."""
+        if not client_id:
+            return None
+        with self._lock:
+            seq = self._ids.get(client_id)
+            if seq is not None:
+                self.duplicates += 1
+            return seq
+
+    def _compact(self):
+        """Rewrite the journal with just the current seq and remembered ids."""
+        self._journal.close()
+        tmp = self._journal_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(f"{self.seq},\n")
+            for client_id, seq in self._ids.items():
+                f.write(f"{seq},{client_id}\n")
+        os.replace(tmp, self._journal_path)
+        self._journal_lines = len(self._ids) + 1
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def pending(self):
+        """Spooled orders the EA has not picked up yet."""
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".json"))
+
+    def close(self):
+        with self._lock:
+            self._journal.close()
+
+
+class FillMatcher:
+    """Pairs fills from executions.csv with spooled orders, for order-to-fill latency.
+
+    executions.csv carries no order id, but the EA executes spool files in
+    sequence order, so each fill is matched to the oldest pending order with
+    the same side and lot. Orders unmatched after ``max_age`` seconds (rejected
+    by the broker) are dropped.
+
+    Fills are read from the CSV before the position book sees them (only after
+    their DB write), so every opening fill read is also held as ``unbooked``
+    until ``booked`` (or ``dropped``) releases it; ``in_flight`` counts both,
+    and an order is never missing from the risk check in between, even while
+    the database is down.
+    """
+
+    def __init__(self, max_age=300.0):
+        self.max_age = max_age
+        self.pending = deque()     # (spooled_at, seq, side, lot)
+        self.unbooked = {}         # ticket -> lot of opening fills read but not in the book yet
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(side, lot):
+        return side.lower(), round(float(lot), 2)
+
+    def spooled(self, seq, order, at):
+        with self._lock:
+            self.pending.append((at, seq, *self._key(order["side"], order["lot"])))
+
+    def _expire(self, at):
+        while self.pending and at - self.pending[0][0] > self.max_age:
+            self.pending.popleft()
+
+    def in_flight(self, at):
+        """Lots of the spooled orders still waiting for their fill or for the book."""
+        with self._lock:
+            self._expire(at)
+            return [lot for _, _, _, lot in self.pending] + list(self.unbooked.values())
+
+    def booked(self, rows):
+        """Release the fills in ``rows`` once the position book holds them."""
+        with self._lock:
+            for row in rows:
+                self.unbooked.pop(row[0], None)
+
+    dropped = booked   # rows the database rejected never reach the book
+
+    def filled(self, rows, at):
+        """Latencies in seconds for the fill rows ``(ticket, time, symbol, side, lot, price, kind)``."""
+        latencies = []
+        with self._lock:
+            self._expire(at)
+            for row in rows:
+                if len(row) > 6 and row[6] != "open":
+                    continue
+                try:
+                    key = self._key(row[3], row[4])
+                except ValueError:
+                    continue
+                self.unbooked[row[0]] = key[1]
+                for i, (spooled_at, _, side, lot) in enumerate(self.pending):
+                    if (side, lot) == key:
+                        del self.pending[i]
+                        latencies.append(at - spooled_at)
+                        break
+        return latencies
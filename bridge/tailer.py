@@ -0,0 +1,266 @@
+"""
+Rotation-aware CSV tailer with persisted checkpoints.
+
+A ``FileTailer`` reads only the bytes appended to a file since its last
+position, in large buffered reads, and hands complete lines on as parsed row
+chunks; a trailing partial line is left for the next poll. Each chunk carries
+a mark ``(identity, end_offset)``; the consumer passes it back to ``ack``
+once the rows are stored, and only then is the checkpoint moved and written
+(tmp + ``os.replace``), so a restart resumes from the last stored row in
+constant time instead of re-reading the file.
+
+The file is reopened on every poll (never held open, so the EA can still
+rotate or truncate it on Windows) and compared against the position:
+
+    identity (st_dev, st_ino) changed   rotated/replaced -> start at 0
+    size < position                     truncated        -> start at 0
+    bytes before position differ        rewritten        -> start at 0
+
+Rows still unread in a rotated-away file are lost; rows read but not yet
+acknowledged at a crash are read again (ticks at-least-once, executions are
+de-duplicated by ticket).
+"""
+import csv
+import hashlib
+import json
+import os
+import queue
+import threading
+
+from metrics import SampledLog
+
+POLL_SECONDS = 1.0            # re-check the file even if an event is missed
+READ_BYTES = 1 << 20
+PUT_TIMEOUT = 0.5
+SIGNATURE_BYTES = 64          # bytes before the position that must not change
+DEFAULT_READ_ROWS = 1000
+
+log = SampledLog("bridge.tailer")
+
+
+def file_identity(st):
+    return [st.st_dev, st.st_ino]
+
+
+class Checkpoint:
+    """Atomically persisted ``{identity, offset, signature}`` for one file."""
+
+    def __init__(self, path):
+        self.path = str(path) if path else None
+
+    def load(self):
+        if self.path is None:
+            return None
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, state):
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+
+EMPTY_SIGNATURE = hashlib.sha1(b"").hexdigest()
+
+
+def _signature(f, offset):
+    start = max(offset - SIGNATURE_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+class FileTailer:
+    """Feeds parsed rows from the complete lines appended to ``path`` into ``out``.
+
+    ``wake()`` is cheap and safe to call from the watchdog thread.
+    ``on_read(rows)`` sees each chunk as soon as it is queued, before it is stored.
+    ``header_fields`` are first-column values of header lines to skip.
+    """
+
+    def __init__(self, path, out, parse, name, chunk_rows=DEFAULT_READ_ROWS, on_read=None,
+                 checkpoint=None, header_fields=()):
+        self.path = str(path)
+        self.out = out
+        self.parse = parse
+        self.name = name
+        self.chunk_rows = chunk_rows
+        self.on_read = on_read
+        self.checkpoint = Checkpoint(checkpoint)
+        self.header_fields = tuple(header_fields)
+        self.identity = None
+        self.offset = 0           # read position
+        self.committed = 0        # acknowledged (stored) position
+        self.tail_signature = EMPTY_SIGNATURE   # of the bytes just before ``offset``
+        self.size = 0
+        self.rows_read = 0
+        self.rows_dropped = 0
+        self.stalls = 0
+        self.rotations = 0
+        self.truncations = 0
+        self._lock = threading.Lock()   # identity/committed vs ack from the writer thread
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"tail-{name}", daemon=True)
+        self._resume()
+
+    # ------------------------------------------------------------------- lifecycle
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+
+    def wake(self):
+        self._wake.set()
+
+    @property
+    def lag_bytes(self):
+        return max(self.size - self.offset, 0)
+
+    # ------------------------------------------------------------------- checkpoints
+    def _resume(self):
+        state = self.checkpoint.load()
+        if not state:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                st = os.fstat(f.fileno())
+                if (state["identity"] == file_identity(st) and st.st_size >= state["offset"]
+                        and _signature(f, state["offset"]) == state["signature"]):
+                    self.identity = state["identity"]
+                    self.offset = self.committed = state["offset"]
+                    self.tail_signature = state["signature"]
+        except (OSError, KeyError):
+            pass
+
+    def ack(self, mark):
+        """Record that everything up to ``mark`` is stored and persist it."""
+        identity, offset = mark
+        with self._lock:
+            if identity != self.identity or offset <= self.committed:
+                return  # file was rotated since, or an older mark
+            self.committed = offset
+        try:
+            with open(self.path, "rb") as f:
+                if file_identity(os.fstat(f.fileno())) != identity:
+                    return
+                signature = _signature(f, offset)
+        except OSError:
+            return
+        self.checkpoint.save({"identity": identity, "offset": offset, "signature": signature})
+
+    # ------------------------------------------------------------------- reading
+    def _put(self, item):
+        """Block until the writer has room; False if stopped meanwhile."""
+        while not self._stop.is_set():
+            try:
+                self.out.put(item, timeout=PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                self.stalls += 1
+        return False
+
+    def _emit(self, chunk, end_offset):
+        if chunk and not self._put((chunk, (self.identity, end_offset))):
+            return False
+        if chunk and self.on_read is not None:
+            try:
+                self.on_read(chunk)
+            except Exception as exc:  # never re-read rows that are already queued
+                log.warning("on_read_error", lane=self.name, error=str(exc))
+        self.rows_read += len(chunk)
+        self.offset = end_offset
+        return True
+
+    def _check_position(self, f, st):
+        identity = file_identity(st)
+        if identity != self.identity:
+            if self.identity is not None:
+                self.rotations += 1
+                log.info("rotated", lane=self.name, path=self.path)
+            self._restart(identity)
+        elif st.st_size < self.offset or _signature(f, self.offset) != self.tail_signature:
+            self.truncations += 1
+            log.info("truncated", lane=self.name, path=self.path)
+            self._restart(identity)
+
+    def _restart(self, identity):
+        with self._lock:
+            self.identity = identity
+            self.offset = self.committed = 0
+        self.tail_signature = EMPTY_SIGNATURE
+
+    def poll(self):
+        """Queue every complete line currently past ``offset``."""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            return  # EA has not created the file yet
+        with f:
+            st = os.fstat(f.fileno())
+            if self.identity is not None and self.identity == file_identity(st) and st.st_size == self.offset:
+                self.size = st.st_size
+                return  # nothing new; skip the signature read
+            self._check_position(f, st)
+            self.size = st.st_size
+
+            while self.offset < self.size and not self._stop.is_set():
+                f.seek(self.offset)
+                data = f.read(READ_BYTES)
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    break  # only a partial line so far; wait for the rest
+                if not self._parse_block(data[:end]):
+                    break
+            self.tail_signature = _signature(f, self.offset)
+
+    def _parse_block(self, block):
+        pos = self.offset
+        chunk = []
+        lines = block.splitlines(keepends=True)
+        texts = [raw.decode("utf-8", "replace") for raw in lines]
+        for raw, fields in zip(lines, csv.reader(texts)):
+            pos += len(raw)
+            if not fields or fields[0] in self.header_fields:
+                continue
+            row = self.parse(fields)
+            if row is None:
+                self.rows_dropped += 1
+                continue
+            chunk.append(row)
+            if len(chunk) >= self.chunk_rows:
+                if not self._emit(chunk, pos):
+                    return False
+                chunk = []
+        return self._emit(chunk, pos)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(POLL_SECONDS)
+            self._wake.clear()
+            try:
+                self.poll()
+            except Exception as exc:
+                log.warning("tailer_error", lane=self.name, error=str(exc))
+
+    def stats(self):
+        return {
+            "rows_read": self.rows_read,
+            "rows_dropped": self.rows_dropped,
+            "stalls": self.stalls,
+            "offset": self.offset,
+            "committed": self.committed,
+            "lag_bytes": self.lag_bytes,
+            "rotations": self.rotations,
+            "truncations": self.truncations,
+        }
@@ -0,0 +1,80 @@
+"""
+Downsampled equity curve for the dashboard.
+
+``lttb`` picks ``n`` of a series' points with the largest-triangle-three-
+buckets algorithm, which keeps the visual shape (peaks, drawdowns) that plain
+striding loses. ``EquityPyramid`` precomputes the curve at 1/4, 1/16, ...
+of its points, each level an LTTB reduction of the one below. A query for a
+time range picks the coarsest level that still has at least ``points`` points
+in that range and reduces only that slice, so a zoomed-out view never touches
+the full series and every response is at most ``MAX_POINTS`` points.
+"""
+import numpy as np
+
+DEFAULT_POINTS = 1000
+MAX_POINTS = 5000
+LEVEL_FACTOR = 4
+MIN_LEVEL_POINTS = 1000   # stop adding levels below this size
+
+
+def lttb(x, y, n):
+    """Indices of the ``n`` points of ``(x, y)`` that LTTB keeps (first and last always)."""
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:max(n, 0)], dtype=np.int64)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)   # n - 2 buckets between the end points
+    # average of each next bucket (the last one looks at the final point)
+    nxt_start, nxt_end = edges[1:], np.append(edges[2:], size)
+    csx, csy = np.concatenate(([0.0], np.cumsum(x))), np.concatenate(([0.0], np.cumsum(y)))
+    avg_x = (csx[nxt_end] - csx[nxt_start]) / (nxt_end - nxt_start)
+    avg_y = (csy[nxt_end] - csy[nxt_start]) / (nxt_end - nxt_start)
+
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        ax, ay = x[a], y[a]
+        area = np.abs((ax - avg_x[i]) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (avg_y[i] - ay))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def parse_times(times):
+    """Epoch milliseconds of ``YYYY-MM-DD HH:MM:SS`` stamps."""
+    return np.array([t.replace(" ", "T") for t in times], dtype="datetime64[ms]").astype(np.int64)
+
+
+class EquityPyramid:
+    """``query`` returns indices into the ``x`` / ``y`` given, which need not be sorted by time."""
+
+    def __init__(self, x, y):
+        x = np.asarray(x, dtype=np.int64)           # epoch ms
+        self.order = np.argsort(x, kind="stable")   # trades are logged by exit, plotted by entry
+        self.x = x[self.order]
+        self.y = np.asarray(y, dtype=np.float64)[self.order]
+        self.levels = [np.arange(len(self.x))]      # indices into self.x / self.y, finest first
+        while len(self.levels[-1]) // LEVEL_FACTOR >= MIN_LEVEL_POINTS:
+            idx = self.levels[-1]
+            keep = lttb(self.x[idx], self.y[idx], len(idx) // LEVEL_FACTOR)
+            self.levels.append(idx[keep])
+
+    def __len__(self):
+        return len(self.x)
+
+    def query(self, start=None, end=None, points=DEFAULT_POINTS):
+        """Indices of at most ``points`` points with ``start <= x <= end`` (epoch ms)."""
+        points = max(3, min(points, MAX_POINTS))
+        for idx in reversed(self.levels):
+            xs = self.x[idx]
+            lo = 0 if start is None else np.searchsorted(xs, start, "left")
+            hi = len(xs) if end is None else np.searchsorted(xs, end, "right")
+            if hi - lo >= points or idx is self.levels[0]:
+                break
+        window = idx[lo:hi]
+        return self.order[window[lttb(self.x[window], self.y[window], points)]]
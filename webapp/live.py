@@ -0,0 +1,153 @@
+"""
+Live fills for the dashboard, pushed over Server-Sent Events.
+
+One ``LiveFeed`` thread holds the webapp's only DB connection. It LISTENs on
+the ``executions`` channel (announced by the bridge's insert trigger, see
+bridge/schema.py), loads the stored fills once, and keeps a ``PositionBook``
+current. Every browser on ``/api/stream`` gets a bounded asyncio queue and
+the listener fans each event out to all of them, so the DB sees one
+connection however many dashboards are open. A client that falls
+``CLIENT_QUEUE`` events behind is dropped; EventSource reconnects and starts
+again from a fresh snapshot.
+
+Events: ``snapshot`` (positions, on connect and after the DB reconnects) and
+``fill`` (an open or close row, the positions after it, and the realized P&L
+delta, non-zero when a close row books a ticket's P&L). A notification that
+cannot be applied is logged and skipped.
+"""
+import asyncio
+import json
+import logging
+import os
+import select
+import threading
+
+import psycopg2
+
+from bridge.db import DEFAULT_DSN
+from bridge.positions import LOAD_SQL, PositionBook
+
+CHANNEL = "executions"
+CLIENT_QUEUE = 256
+HEARTBEAT_SECONDS = 15.0
+POLL_SECONDS = 1.0
+RETRY_INITIAL = 1.0
+RETRY_MAX = 30.0
+
+DSN = os.environ.get("EDGEFLOW_DSN", DEFAULT_DSN)
+
+log = logging.getLogger("webapp.live")
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class LiveFeed:
+    def __init__(self, dsn=DSN, risk=None):
+        self.dsn = dsn
+        self.risk = risk or {}
+        self.book = PositionBook(self.risk)
+        self.connected = False
+        self.fills = 0
+        self.dropped_clients = 0
+        self.clients = set()          # asyncio queues, touched only on the event loop
+        self.loop = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-feed", daemon=True)
+
+    # ------------------------------------------------------------------- lifecycle
+    def start(self, loop):
+        self.loop = loop
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+    # ------------------------------------------------------------------- clients (event loop)
+    def subscribe(self):
+        q = asyncio.Queue(maxsize=CLIENT_QUEUE)
+        self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        self.clients.discard(q)
+
+    def _fanout(self, event):
+        for q in list(self.clients):
+            try:
+                q.put_nowait(event)
+            except asyncio.QueueFull:
+                self.clients.discard(q)    # its stream ends once it has drained
+                self.dropped_clients += 1
+
+    async def events(self, request):
+        """SSE text for one client until it disconnects or falls behind."""
+        q = self.subscribe()
+        try:
+            yield sse("snapshot", self.snapshot())
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(q.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if q not in self.clients:
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield sse(*event)
+        finally:
+            self.unsubscribe(q)
+
+    # ------------------------------------------------------------------- listener thread
+    def snapshot(self):
+        return {"connected": self.connected, **self.book.snapshot()}
+
+    def _publish(self, event, data):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._fanout, (event, data))
+
+    def _listen(self):
+        conn = psycopg2.connect(self.dsn)
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")      # before loading, so no fill falls in between
+                cur.execute(LOAD_SQL)
+                book = PositionBook(self.risk)
+                book.apply(cur.fetchall())
+            self.book, self.connected = book, True  # fresh book: fills may have been missed while away
+            self._publish("snapshot", self.snapshot())
+            while not self._stop.is_set():
+                if select.select([conn], [], [], POLL_SECONDS)[0]:
+                    conn.poll()
+                    while conn.notifies:
+                        payload = conn.notifies.pop(0).payload
+                        try:
+                            self._on_fill(json.loads(payload))
+                        except Exception:   # one bad payload must not stop the feed
+                            log.exception("live feed: skipping bad notification %r", payload)
+        finally:
+            self.connected = False
+            conn.close()
+
+    def _on_fill(self, fill):
+        before = self.book.realized
+        self.book.apply([(fill["ticket"], fill["time"], fill["symbol"], fill["side"], fill["lot"], fill["price"],
+                          fill.get("kind", "open"))])
+        self.fills += 1
+        self._publish("fill", {"fill": fill, "positions": self.snapshot(),
+                               "equity_delta": round(self.book.realized - before, 2)})
+
+    def _run(self):
+        delay = RETRY_INITIAL
+        while not self._stop.is_set():
+            try:
+                self._listen()
+                delay = RETRY_INITIAL
+            except psycopg2.Error as exc:   # down, or the bridge has not created the table yet
+                log.warning("live feed: database unavailable (%s), retrying in %.0fs", str(exc).strip(), delay)
+                self._publish("snapshot", self.snapshot())
+                self._stop.wait(delay)
+                delay = min(delay * 2, RETRY_MAX)
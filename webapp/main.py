@@ -1,9 +1,18 @@
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import csv
+import asyncio
 import os
+import threading
+
+import numpy as np
+import yaml
+
+from webapp.equity import EquityPyramid, parse_times, DEFAULT_POINTS
+from webapp.live import LiveFeed
+from webapp.trade_index import TradeIndex, parse_cursor, parse_days, parse_hours, DEFAULT_LIMIT
+from webapp.trade_log import TradeLog
 
 app = FastAPI()
 
@@ -13,61 +22,101 @@ templates = Jinja2Templates(directory="webapp/templates")
 
 DATA_FILE = os.path.abspath("backtest/simulated_trades.csv")  # ✅ consistent shared path
 
+TRADES = TradeLog(DATA_FILE)  # parsed once, then only appended rows are read
+
+TRADE_INDEX = TradeIndex(DATA_FILE)  # .npy index next to the CSV, refreshed when it changes
+
+RISK_FILE = os.path.abspath("docs/risk-config.yaml")
+
+def load_risk():
+    if not os.path.exists(RISK_FILE):
+        return None
+    with open(RISK_FILE) as f:
+        return yaml.safe_load(f)
+
+LIVE = LiveFeed(risk=load_risk())
+
+@app.on_event("startup")
+async def _start_live_feed():
+    LIVE.start(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+def _stop_live_feed():
+    LIVE.stop()
+
 def load_trade_stats():
-    total_trades = 0
-    winning_trades = 0
-    total_profit = 0.0
+    return TRADES.stats()
 
-    if not os.path.exists(DATA_FILE):
-        return {
-            "total_trades": 0,
-            "win_rate": 0,
-            "total_profit": 0.0,
-            "open_trades": 0
-        }
-
-    with open(DATA_FILE, newline='') as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            pnl = float(row.get("pnl", 0))
-            total_profit += pnl
-            if pnl > 0:
-                winning_trades += 1
-            total_trades += 1
-
-    win_rate = (winning_trades / total_trades) * 100 if total_trades > 0 else 0
-
-    return {
-        "total_trades": total_trades,
-        "win_rate": round(win_rate, 2),
-        "total_profit": round(total_profit, 2),
-        "open_trades": 0  # simulation only, no live trades
-    }
+_pyramid = None  # ((full_parses, trades), EquityPyramid, times, equity)
+_pyramid_lock = threading.Lock()
 
-@app.get("/", response_class=HTMLResponse)
-def index(request: Request):
-    stats = load_trade_stats()
-    equity_points = []
-    equity = 0.0
+def equity_pyramid():
+    """Pyramid over the current trade log; rebuilt only when the log has changed."""
+    global _pyramid
+    stats, times, equity = TRADES.snapshot()
+    n = stats["total_trades"]
+    key = (TRADES.full_parses, n)
+    with _pyramid_lock:
+        if _pyramid is None or _pyramid[0] != key:
+            times, equity = times[:n], equity[:n]
+            _pyramid = (key, EquityPyramid(parse_times(times), equity), times, equity)
+        return _pyramid
 
-    csv_path = os.path.abspath("backtest/simulated_trades.csv")
+def equity_points(start=None, end=None, points=DEFAULT_POINTS):
+    _, pyramid, times, equity = equity_pyramid()
+    return [{"x": times[i], "y": equity[i]} for i in pyramid.query(start, end, points)]
 
-    if os.path.exists(csv_path):
-        with open(csv_path) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                pnl = float(row.get("pnl", 0))
-                equity += pnl
-                equity_points.append({
-                    "x": row["entry_time"],
-                    "y": round(equity, 2)
-                })
+def _epoch_ms(stamp):
+    if stamp is None:
+        return None
+    try:
+        return int(np.datetime64(stamp.replace(" ", "T"), "ms").astype(np.int64))
+    except ValueError:
+        raise HTTPException(400, f"bad timestamp {stamp!r}, expected YYYY-MM-DD HH:MM:SS")
 
-    print(f"✅ Loaded {len(equity_points)} equity points")
+@app.get("/", response_class=HTMLResponse)
+def index(request: Request):
+    stats = TRADES.stats()
+    if LIVE.connected:
+        stats["open_trades"] = LIVE.book.open_count
 
     return templates.TemplateResponse("index.html", {
         "request": request,
         **stats,
-        "points": equity_points
+        "points": equity_points()
     })
 
+@app.get("/api/equity")
+def api_equity(start: str | None = None, end: str | None = None, points: int = DEFAULT_POINTS):
+    """Equity curve between ``start`` and ``end`` (entry time), LTTB-downsampled to ``points``."""
+    pts = equity_points(_epoch_ms(start), _epoch_ms(end), points)
+    return {"total": len(equity_pyramid()[1]), "points": pts}
+
+@app.get("/api/trades")
+def api_trades(start: str | None = None, end: str | None = None, result: str | None = None,
+               hour: str | None = None, day: str | None = None, cursor: str | None = None,
+               limit: int = DEFAULT_LIMIT):
+    """Trades in entry-time order. ``hour``/``day`` take lists (``9,10`` / ``mon,fri``);
+    pass the returned ``next_cursor`` back as ``cursor`` for the next page."""
+    if not os.path.exists(DATA_FILE):
+        return {"trades": [], "next_cursor": None}
+    TRADE_INDEX.refresh()
+    try:
+        trades, next_cursor = TRADE_INDEX.page(
+            None if start is None else _epoch_ms(start) // 1000,
+            None if end is None else _epoch_ms(end) // 1000,
+            result,
+            parse_hours(hour) if hour else None,
+            parse_days(day) if day else None,
+            parse_cursor(cursor) if cursor else None,
+            limit,
+        )
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    return {"trades": trades, "next_cursor": next_cursor}
+
+@app.get("/api/stream")
+async def api_stream(request: Request):
+    """Server-Sent Events: ``snapshot`` on connect, then one ``fill`` per new execution."""
+    return StreamingResponse(LIVE.events(request), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,283 @@
+"""
+On-disk entry-time index over the backtest trade log, for ``/api/trades``.
+
+The index stores, per trade, its entry time (epoch seconds), P&L and the byte
+offset of its CSV line, sorted by (entry time, offset), as .npy files next to
+the CSV that later loads memory-map. Each build goes to its own directory
+(``.trade_index/<name>/build-*``) and the ``current`` file is switched to it
+atomically; older builds are deleted once nothing maps them (Windows refuses
+to delete a mapped file, so one still in use is left for the next refresh). A page is
+served by a binary search to the time range / cursor, a vectorized filter over
+the next slice of the index, and one seek + readline per returned trade, so
+its cost does not grow with the size of the history.
+
+The ``entry_time`` and ``pnl`` columns are looked up in the CSV header (the
+simulators write them in different positions) and recorded in meta.json.
+Cursors are the ``entry:offset`` key of the last trade returned, so a cursor
+stays valid when the log grows. When the CSV has only been appended to (same
+header, same bytes before the indexed end), only the new lines are parsed and
+merged in; otherwise the index is rebuilt.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+INDEX_DIR_NAME = ".trade_index"
+INDEX_VERSION = 2
+SIGNATURE_BYTES = 64
+SCAN_ROWS = 1 << 16          # index rows filtered per step while filling a page
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+DAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+COLUMNS = ("entry", "offset", "pnl")
+POINTER_NAME = "current"
+TIME_FIELD, PNL_FIELD = "entry_time", "pnl"
+
+
+def _signature(f, offset):
+    start = max(offset - SIGNATURE_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+def epoch_seconds(stamps):
+    return np.array(stamps, dtype="datetime64[s]").astype(np.int64)
+
+
+def parse_cursor(cursor):
+    entry, _, offset = cursor.partition(":")
+    try:
+        return int(entry), int(offset)
+    except ValueError:
+        raise ValueError(f"bad cursor {cursor!r}, expected <entry>:<offset>") from None
+
+
+def parse_hours(text):
+    try:
+        hours = [int(h) for h in text.split(",") if h.strip()]
+    except ValueError:
+        hours = None
+    if hours is None or any(not 0 <= h <= 23 for h in hours):
+        raise ValueError(f"hours must be 0-23, got {text!r}")
+    return hours
+
+
+def parse_days(text):
+    """``mon,fri`` or ``0,4`` -> ``[0, 4]`` (Monday = 0)."""
+    days = []
+    for day in (d.strip().lower() for d in text.split(",") if d.strip()):
+        if day[:3] in DAYS:
+            days.append(DAYS.index(day[:3]))
+        elif day.isdigit() and int(day) < 7:
+            days.append(int(day))
+        else:
+            raise ValueError(f"unknown day {day!r}, expected mon..sun or 0-6")
+    return days
+
+
+def header_columns(header):
+    """``{"entry_time": i, "pnl": j}`` from a CSV header; None if either is missing."""
+    columns = {name: i for i, name in enumerate(header)}
+    if TIME_FIELD not in columns or PNL_FIELD not in columns:
+        return None
+    return {TIME_FIELD: columns[TIME_FIELD], PNL_FIELD: columns[PNL_FIELD]}
+
+
+def _parse_lines(data, base, columns):
+    """Entry seconds, line offsets and P&L of the complete CSV lines in ``data``."""
+    offsets, stamps, pnls = [], [], []
+    pos = base
+    lines = data.splitlines(keepends=True) if columns else []   # nothing to index without both
+    rows = csv.reader(line.decode("utf-8", "replace") for line in lines)
+    time_col, pnl_col = (columns[TIME_FIELD], columns[PNL_FIELD]) if columns else (None, None)
+    for i, (raw, row) in enumerate(zip(lines, rows)):
+        if row and not (base == 0 and i == 0):   # header
+            try:
+                pnl, stamp = float(row[pnl_col]), row[time_col]
+            except (ValueError, IndexError):
+                pass
+            else:
+                pnls.append(pnl)
+                offsets.append(pos)
+                stamps.append(stamp)
+        pos += len(raw)
+    try:
+        entry = epoch_seconds(stamps)
+    except ValueError:  # a malformed stamp somewhere: drop just those rows
+        keep = []
+        for i, stamp in enumerate(stamps):
+            try:
+                np.datetime64(stamp, "s")
+                keep.append(i)
+            except ValueError:
+                pass
+        stamps, offsets, pnls = ([col[i] for i in keep] for col in (stamps, offsets, pnls))
+        entry = epoch_seconds(stamps)
+    return entry, np.array(offsets, dtype=np.int64), np.array(pnls, dtype=np.float64)
+
+
+class TradeIndex:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.dir = os.path.join(os.path.dirname(self.path), INDEX_DIR_NAME, os.path.basename(self.path))
+        self.meta = None
+        self.arrays = None
+        self.header = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------- build / refresh
+    def _current(self):
+        with open(os.path.join(self.dir, POINTER_NAME)) as f:
+            return f.read().strip()
+
+    def _load(self):
+        try:
+            build = os.path.join(self.dir, self._current())
+            with open(os.path.join(build, "meta.json")) as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                return None
+            arrays = {name: np.load(os.path.join(build, f"{name}.npy"), mmap_mode="r") for name in COLUMNS}
+        except (OSError, ValueError):
+            return None
+        return meta, arrays
+
+    def _save(self, meta, arrays):
+        """Write a new build directory, then point ``current`` at it."""
+        os.makedirs(self.dir, exist_ok=True)
+        build = tempfile.mkdtemp(dir=self.dir, prefix="build-")
+        try:
+            for name in COLUMNS:
+                np.save(os.path.join(build, f"{name}.npy"), arrays[name])
+            with open(os.path.join(build, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            fd, tmp = tempfile.mkstemp(dir=self.dir, prefix=".current-")
+            with os.fdopen(fd, "w") as f:
+                f.write(os.path.basename(build))
+            os.replace(tmp, os.path.join(self.dir, POINTER_NAME))
+        except BaseException:
+            shutil.rmtree(build, ignore_errors=True)
+            raise
+
+    def _prune(self):
+        """Delete every build but the current one; a build still mapped is retried next time."""
+        try:
+            keep = {self._current(), POINTER_NAME}
+            names = os.listdir(self.dir)
+        except OSError:
+            return
+        for name in names:
+            path = os.path.join(self.dir, name)
+            if name in keep:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def refresh(self):
+        """Make the index match the CSV; returns "fresh", "appended" or "rebuilt"."""
+        with self._lock:
+            if self.meta is None:
+                loaded = self._load()
+                if loaded is not None:
+                    self.meta, self.arrays = loaded
+            with open(self.path, "rb") as f:
+                st = os.fstat(f.fileno())
+                self.header = next(csv.reader([f.readline().decode("utf-8", "replace")]), [])
+                meta = self.meta
+                if meta is not None and meta["header"] != self.header:
+                    meta = None     # columns moved or renamed: rebuild
+                if meta is not None and (meta["size"], meta["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+                    return "fresh"
+                appended = (meta is not None and st.st_size >= meta["end"]
+                            and _signature(f, meta["end"]) == meta["signature"])
+                columns = header_columns(self.header)
+                base = meta["end"] if appended else 0
+                f.seek(base)
+                data = f.read(st.st_size - base)
+                end = base + data.rfind(b"\n") + 1
+                entry, offset, pnl = _parse_lines(data[:end - base], base, columns)
+                if appended:
+                    entry = np.concatenate((self.arrays["entry"], entry))
+                    offset = np.concatenate((self.arrays["offset"], offset))
+                    pnl = np.concatenate((self.arrays["pnl"], pnl))
+                order = np.lexsort((offset, entry))
+                arrays = {"entry": entry[order], "offset": offset[order], "pnl": pnl[order]}
+                meta = {"version": INDEX_VERSION, "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+                        "end": end, "signature": _signature(f, end), "rows": int(len(entry)),
+                        "header": self.header, "columns": columns}
+            self._save(meta, arrays)
+            self.arrays = None      # drop the old maps before deleting their build
+            self.meta, self.arrays = self._load()
+            self._prune()
+            return "appended" if appended else "rebuilt"
+
+    def __len__(self):
+        return 0 if self.meta is None else self.meta["rows"]
+
+    # ------------------------------------------------------------------- queries
+    def _mask(self, entry, pnl, result, hours, days):
+        mask = np.ones(len(entry), dtype=bool)
+        if result == "win":
+            mask &= pnl > 0
+        elif result == "loss":
+            mask &= pnl < 0
+        elif result == "flat":
+            mask &= pnl == 0
+        if hours:
+            mask &= np.isin(entry // 3600 % 24, hours)
+        if days:
+            mask &= np.isin((entry // 86400 + 3) % 7, days)   # 1970-01-01 was a Thursday
+        return mask
+
+    def page(self, start=None, end=None, result=None, hours=None, days=None,
+             cursor=None, limit=DEFAULT_LIMIT):
+        """Up to ``limit`` trades in entry-time order plus the cursor of the next page.
+
+        ``start``/``end`` are inclusive entry-time bounds in epoch seconds,
+        ``result`` is win/loss/flat, ``hours`` 0-23 and ``days`` 0 (Mon) - 6.
+        """
+        if result not in (None, "win", "loss", "flat"):
+            raise ValueError(f"result must be win, loss or flat, got {result!r}")
+        limit = max(1, min(limit, MAX_LIMIT))
+        with self._lock:
+            arrays = self.arrays
+        if arrays is None:
+            return [], None
+        entry, offsets, pnl = arrays["entry"], arrays["offset"], arrays["pnl"]
+        lo = 0 if start is None else int(np.searchsorted(entry, start, "left"))
+        hi = len(entry) if end is None else int(np.searchsorted(entry, end, "right"))
+        if cursor is not None:
+            c_entry, c_offset = cursor
+            pos = int(np.searchsorted(entry, c_entry, "left"))
+            tie_end = int(np.searchsorted(entry, c_entry, "right"))
+            pos += int(np.searchsorted(offsets[pos:tie_end], c_offset, "right"))
+            lo = max(lo, pos)
+
+        picked = []
+        while lo < hi and len(picked) < limit:
+            stop = min(lo + SCAN_ROWS, hi)
+            hits = np.flatnonzero(self._mask(entry[lo:stop], pnl[lo:stop], result, hours, days))
+            picked.extend((lo + hits[:limit - len(picked)]).tolist())
+            lo = stop
+
+        trades = []
+        with open(self.path, "rb") as f:
+            for i in picked:
+                f.seek(int(offsets[i]))
+                row = next(csv.reader(io.StringIO(f.readline().decode("utf-8", "replace"))))
+                trades.append(dict(zip(self.header, row)))
+        more = picked and (len(picked) == limit) and (picked[-1] + 1 < hi)
+        next_cursor = f"{int(entry[picked[-1]])}:{int(offsets[picked[-1]])}" if more else None
+        return trades, next_cursor
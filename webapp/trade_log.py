@@ -0,0 +1,111 @@
+"""
+Cached, incrementally refreshed view of the backtest trade log.
+
+``TradeLog.snapshot()`` returns the dashboard stats and the equity series,
+built together in one pass over ``simulated_trades.csv``. The result is
+cached on the file's (mtime, size); when the file has only grown, just the
+appended lines are parsed and folded into the running totals. A file that
+shrank or whose bytes before the last read position changed is re-read from
+the start.
+"""
+import csv
+import hashlib
+import io
+import os
+import threading
+
+SIGNATURE_BYTES = 64   # bytes before the read position that must not change
+
+
+def _signature(f, offset):
+    start = max(offset - SIGNATURE_BYTES, 0)
+    f.seek(start)
+    return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+
+class TradeLog:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.full_parses = 0
+        self.tail_parses = 0
+        self._reset()
+
+    def _reset(self):
+        self.key = None            # (mtime_ns, size) the snapshot was built from
+        self.offset = 0            # bytes parsed (always at a line boundary)
+        self.signature = None
+        self.columns = None
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.total_profit = 0.0
+        self.times = []            # entry_time per trade
+        self.equity = []           # cumulative P&L after each trade
+
+    def _fold(self, block):
+        reader = csv.reader(io.StringIO(block.decode("utf-8", "replace")))
+        if self.columns is None:
+            header = next(reader, None)
+            if header is None:
+                return
+            self.columns = {name: i for i, name in enumerate(header)}
+        pnl_col = self.columns.get("pnl")
+        time_col = self.columns.get("entry_time")
+        equity = self.equity[-1] if self.equity else 0.0
+        for row in reader:
+            if not row:
+                continue
+            try:
+                pnl = float(row[pnl_col]) if pnl_col is not None else 0.0
+            except (ValueError, IndexError):
+                continue
+            equity += pnl
+            self.total_profit += pnl
+            self.total_trades += 1
+            if pnl > 0:
+                self.winning_trades += 1
+            self.times.append(row[time_col] if time_col is not None else "")
+            self.equity.append(round(equity, 2))
+
+    def refresh(self):
+        """Bring the cache up to date with the file; returns True if anything was parsed."""
+        try:
+            f = open(self.path, "rb")
+        except OSError:
+            if self.key is not None:
+                self._reset()
+            return False
+        with f:
+            st = os.fstat(f.fileno())
+            key = (st.st_mtime_ns, st.st_size)
+            if key == self.key:
+                return False
+            grown = (self.signature is not None and st.st_size >= self.offset
+                     and _signature(f, self.offset) == self.signature)
+            if grown:
+                self.tail_parses += 1
+            else:
+                self._reset()
+                self.full_parses += 1
+            f.seek(self.offset)
+            data = f.read(st.st_size - self.offset)
+            end = data.rfind(b"\n") + 1   # a partly written last line waits for the next refresh
+            self._fold(data[:end])
+            self.offset += end
+            self.signature = _signature(f, self.offset)
+            self.key = key
+            return True
+
+    def snapshot(self):
+        with self._lock:
+            self.refresh()
+            total = self.total_trades
+            return {
+                "total_trades": total,
+                "win_rate": round(self.winning_trades / total * 100, 2) if total else 0,
+                "total_profit": round(self.total_profit, 2),
+                "open_trades": 0,  # simulation only, no live trades
+            }, self.times, self.equity
+
+    def stats(self):
+        return self.snapshot()[0]